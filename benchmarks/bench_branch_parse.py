@@ -0,0 +1,58 @@
+# 分店/人員分頁解析效能：舊版逐欄 to_numeric vs. engine.branch_sheet (整塊轉換)，並確認耗時隨儲存格數線性成長
+# 執行方式：python benchmarks/bench_branch_parse.py
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_leaderboard_clean import best_of
+from benchmarks.bench_schema_memory import make_branch_sheet
+from engine.branch_sheet import parse_branch_sheet
+
+
+def legacy_parse(df_raw):
+    # 舊版 load_data 的解析邏輯 (固定版面、逐欄轉數字、失敗時預設 2026/1)
+    try:
+        year_val = pd.to_numeric(df_raw.iloc[1, 0], errors='coerce')
+        month_val = pd.to_numeric(df_raw.iloc[1, 1], errors='coerce')
+        year_val = int(year_val) if not pd.isna(year_val) else 2026
+        month_val = int(month_val) if not pd.isna(month_val) else 1
+    except:
+        year_val = 2026; month_val = 1
+
+    headers = df_raw.iloc[2].astype(str).str.strip()
+    df = df_raw.iloc[14:].copy()
+    df.columns = headers
+
+    valid_columns = [col for col in df.columns if col.lower() != 'nan' and not col.startswith('Unnamed') and col.strip() != ""]
+    df = df[valid_columns]
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    if not df.empty:
+        first_col = df.columns[0]
+        df = df[pd.to_numeric(df[first_col], errors='coerce').notna()]
+        df['year'] = year_val
+        df['month'] = month_val
+        df['day'] = df[first_col].astype(int)
+        df['日期'] = pd.to_datetime(df[['year', 'month', 'day']], errors='coerce')
+        df = df.drop(columns=['year', 'month', 'day'])
+
+    for col in df.columns:
+        if col != '日期':
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float)
+
+    return df
+
+
+if __name__ == "__main__":
+    # (日數列, 指標欄)：實際分頁約 31x60；較大的尺寸用來看成長趨勢
+    sizes = [(31, 20), (31, 60), (31, 240), (310, 60), (3100, 60), (3100, 240)]
+    print(f"{'rows x cols':>12} {'cells':>9} {'legacy ms':>10} {'new ms':>8} {'speedup':>8} {'ns/cell':>8}")
+    for n_days, n_metrics in sizes:
+        df_raw = make_branch_sheet(n_days=n_days, n_metrics=n_metrics)
+        t_legacy, out_legacy = best_of(legacy_parse, df_raw, repeat=5)
+        t_new, out_new = best_of(parse_branch_sheet, df_raw, repeat=5)
+        cells = n_days * (n_metrics + 1)
+        print(f"{n_days:>5} x {n_metrics:<4} {cells:>9,} {t_legacy * 1000:10.2f} {t_new * 1000:8.2f} "
+              f"{t_legacy / t_new:7.1f}x {t_new * 1e9 / cells:8.0f}")
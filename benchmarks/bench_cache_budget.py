@@ -0,0 +1,51 @@
+# 快取記憶體上限：模擬一天的人員分頁瀏覽 (少數熱門分頁 + 長尾)，比較不同上限下的命中率與用量
+# 執行方式：python benchmarks/bench_cache_budget.py [--stores 100] [--requests 5000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import DataEngine
+from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+from engine.worksheets import staff_for_branch
+
+
+def simulate(conn, max_entries, max_bytes, n_requests, hot_share=0.7, n_hot=20, seed=0):
+    engine = DataEngine(conn, CONFIG_URL, snapshot_dir=tempfile.mkdtemp(prefix="bench-budget-"),
+                        cache_max_entries=max_entries, cache_max_bytes=max_bytes, instrument=True)
+    df_config, _, _ = engine.load_system_config()
+    month_config = df_config[df_config['月份_std'] == df_config['月份_std'].max()]
+    urls = dict(zip(month_config['分店代號'], month_config['試算表網址']))
+    tabs = [(b, ws) for b in urls if b != "ALL" for ws in [b] + staff_for_branch(conn.staff, b)]
+
+    rnd = random.Random(seed)
+    hot = rnd.sample(tabs, min(n_hot, len(tabs)))
+    for _ in range(n_requests):
+        branch, worksheet = rnd.choice(hot) if rnd.random() < hot_share else rnd.choice(tabs)
+        engine.load_data(urls[branch], worksheet, branch)
+
+    stats = engine.instrument.cache_stats().get("sheet", {})
+    hits, misses = stats.get("hit", 0), stats.get("miss", 0)
+    usage = engine.memory_usage()
+    engine.cache.stop_refresher()
+    return len(tabs), hits / max(hits + misses, 1), usage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    conn = SyntheticSheetsConnection(args.stores)
+    budgets = [(None, None), (500, None), (100, None), (50, None), (None, 8 * 2 ** 20), (None, int(1.5 * 2 ** 20))]
+    print(f"{'max_entries':>11} {'max_mb':>7} {'hit rate':>9} {'entries':>8} {'cache MB':>9} {'pinned MB':>10} "
+          f"{'evicted':>8} {'incr MB':>8}")
+    for max_entries, max_bytes in budgets:
+        n_tabs, hit_rate, usage = simulate(conn, max_entries, max_bytes, args.requests)
+        print(f"{str(max_entries or '-'):>11} {(f'{max_bytes / 2 ** 20:.1f}' if max_bytes else '-'):>7} {hit_rate:9.1%} "
+              f"{usage['entries']:>8} {usage['bytes'] / 2 ** 20:9.2f} {usage['pinned_bytes'] / 2 ** 20:10.2f} "
+              f"{usage['budget_evictions']:>8} {usage['incremental']['bytes'] / 2 ** 20:8.2f}")
+    print(f"({n_tabs} 個分頁，{args.requests} 次讀取)")
@@ -0,0 +1,106 @@
+# 排名結果清洗效能比較：舊版逐列 apply vs. engine.clean_leaderboard (向量化)
+# 執行方式：python benchmarks/bench_leaderboard_clean.py [列數]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.leaderboard import clean_leaderboard
+
+
+def make_leaderboard(n_rows=100_000, n_stores=60, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("2022-01-01", periods=max(n_rows // (n_stores * 12), 1), freq="MS")
+    stores = [f"門市{i:02d}店" for i in range(n_stores)]
+
+    month_col = np.repeat(months.strftime("%Y/%m/%d").to_numpy(), n_rows // len(months) + 1)[:n_rows].astype(object)
+    store_col = np.array([stores[i % n_stores] for i in range(n_rows)], dtype=object)
+    person_col = np.array([f"員工{i % 997}" for i in range(n_rows)], dtype=object)
+
+    # 模擬合併儲存格 (空白待填補) 與門市彙總列
+    month_col[rng.random(n_rows) < 0.7] = ""
+    month_col[0] = months[0].strftime("%Y/%m/%d")
+    summary_rows = rng.random(n_rows) < 0.05
+    person_col[summary_rows] = [s.replace("店", "") for s in store_col[summary_rows]]
+    person_col[rng.random(n_rows) < 0.01] = "小計"
+    store_col[rng.random(n_rows) < 0.3] = np.nan
+    store_col[0] = stores[0]
+
+    df = pd.DataFrame({
+        "月份": month_col,
+        "分店": store_col,
+        "人員": person_col,
+        "毛利": rng.integers(0, 200_000, n_rows),
+        "門號": rng.integers(0, 40, n_rows),
+        "來客數": pd.Timestamp("1899-12-30") + pd.to_timedelta(rng.integers(0, 500, n_rows), unit="D"),
+        "更新時間": "2026-01-01 09:00",
+        "--->勿動": "",
+        "後台公式": rng.random(n_rows),
+    })
+    return df
+
+
+def legacy_clean(df_leaderboard_raw):
+    # v7.2 load_system_config 內的原始清洗流程 (僅供比對)
+    df_clean = df_leaderboard_raw.copy()
+    cut_off_index = -1
+    for i, col_name in enumerate(list(df_clean.columns)):
+        if "--->勿動" in str(col_name):
+            cut_off_index = i
+            break
+    if cut_off_index != -1:
+        df_clean = df_clean.iloc[:, :cut_off_index]
+    if '月份' in df_clean.columns:
+        df_clean['月份'] = df_clean['月份'].astype(str).str.strip()
+        df_clean['月份'] = df_clean['月份'].replace(['', 'nan', 'None'], np.nan)
+        df_clean['月份'] = df_clean['月份'].ffill()
+        df_clean['月份_dt'] = pd.to_datetime(df_clean['月份'], errors='coerce')
+        df_clean['月份_std'] = df_clean['月份_dt'].dt.strftime('%Y-%m')
+    if '分店' in df_clean.columns:
+        df_clean['分店'] = df_clean['分店'].astype(str).str.strip()
+        df_clean['分店'] = df_clean['分店'].replace(['', 'nan', 'None'], np.nan)
+        df_clean['分店'] = df_clean['分店'].ffill()
+        df_clean['分店'] = df_clean['分店'].astype(str).str.strip()
+    if '人員' in df_clean.columns:
+        df_clean['人員'] = df_clean['人員'].astype(str).str.strip()
+    if '來客數' in df_clean.columns:
+        if pd.api.types.is_datetime64_any_dtype(df_clean['來客數']):
+            base_date = pd.Timestamp("1899-12-30")
+            df_clean['來客數'] = (df_clean['來客數'] - base_date).dt.days
+        df_clean['來客數'] = pd.to_numeric(df_clean['來客數'], errors='coerce').fillna(0).astype(int)
+    exclude_keywords = ["總表", "ALL", "Total", "小計", "合計", "小西門"]
+    mask_keyword = ~df_clean['人員'].isin(exclude_keywords)
+
+    def is_not_store_summary(row):
+        branch = str(row['分店']).replace('店', '')
+        person = str(row['人員'])
+        if person == branch: return False
+        if person == row['分店']: return False
+        return True
+
+    mask_smart = df_clean.apply(is_not_store_summary, axis=1)
+    return df_clean[mask_keyword & mask_smart]
+
+
+def best_of(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df_raw = make_leaderboard(n_rows)
+
+    t_legacy, out_legacy = best_of(legacy_clean, df_raw)
+    t_new, out_new = best_of(clean_leaderboard, df_raw)
+
+    print(f"rows={n_rows:,}  kept={len(out_new):,}")
+    print(f"legacy (row-wise apply): {t_legacy * 1000:8.1f} ms")
+    print(f"clean_leaderboard      : {t_new * 1000:8.1f} ms  ({t_legacy / t_new:.1f}x)")
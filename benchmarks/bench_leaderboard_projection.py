@@ -0,0 +1,45 @@
+# 排名結果範圍讀取：整頁下載後切刀 vs. 先讀表頭只下載切刀左側 (以及只取最近 N 個月)，比較傳輸儲存格數與耗時
+# 執行方式：python benchmarks/bench_leaderboard_projection.py [--stores 60] [--months 12] [--latency 0.2]
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.leaderboard import read_leaderboard
+from engine.service import parse_leaderboard
+from engine.sources import SheetSource
+from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+
+
+def measure(conn, read):
+    calls, cells = conn.stats["calls"], conn.stats["cells"]
+    t0 = time.perf_counter()
+    df = parse_leaderboard(read())
+    return df, conn.stats["calls"] - calls, conn.stats["cells"] - cells, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=60)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.0, help="每次 API 呼叫的模擬延遲 (秒)")
+    args = parser.parse_args()
+
+    conn = SyntheticSheetsConnection(args.stores, n_months=args.months, latency=args.latency)
+    source = SheetSource(conn)
+    conn.read(CONFIG_URL, "排名結果")            # 先產生分頁，不列入量測
+
+    full, *stats = measure(conn, lambda: source.read(CONFIG_URL, "排名結果", header=0))
+    print(f"{'mode':>10} {'rows':>7} {'calls':>6} {'cells':>9} {'ms':>8}")
+    print(f"{'full':>10} {len(full):>7} {stats[0]:>6} {stats[1]:>9,} {stats[2] * 1000:8.1f}")
+
+    projected, *stats = measure(conn, lambda: read_leaderboard(source, CONFIG_URL, "排名結果"))
+    pd.testing.assert_frame_equal(full, projected)
+    print(f"{'projected':>10} {len(projected):>7} {stats[0]:>6} {stats[1]:>9,} {stats[2] * 1000:8.1f}")
+
+    for n in (1, 2):
+        recent, *stats = measure(conn, lambda: read_leaderboard(source, CONFIG_URL, "排名結果", recent_months=n))
+        print(f"{f'recent {n}':>10} {len(recent):>7} {stats[0]:>6} {stats[1]:>9,} {stats[2] * 1000:8.1f}")
@@ -0,0 +1,36 @@
+# 快取資料的記憶體用量：清洗後原始型態 vs. engine.schema 精簡型態
+# 執行方式：python benchmarks/bench_schema_memory.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_leaderboard_clean import make_leaderboard
+from engine import clean_leaderboard, parse_branch_sheet
+from engine.schema import compact_branch_frame, compact_leaderboard, frame_memory
+
+
+def make_branch_sheet(n_days=31, n_metrics=60, seed=0):
+    # 與實際分頁相同的版面：第 2 列年/月、第 3 列表頭、第 15 列起每日資料
+    rng = np.random.default_rng(seed)
+    rows = [[None] * (n_metrics + 1) for _ in range(14 + n_days)]
+    rows[1][0], rows[1][1] = 2026, 1
+    rows[2] = ['日', '毛利', '門號', '來客數'] + [f'指標{i}' for i in range(n_metrics - 3)]
+    for d in range(1, n_days + 1):
+        rows[13 + d] = [str(d), str(rng.integers(0, 50_000))] + [str(v) for v in rng.integers(0, 30, n_metrics - 1)]
+    return pd.DataFrame(rows, dtype=object)
+
+
+def report(name, before, after):
+    b, a = frame_memory(before), frame_memory(after)
+    print(f"{name:<22} {b / 1024:10.1f} KiB -> {a / 1024:10.1f} KiB  ({b / a:.1f}x)")
+
+
+if __name__ == "__main__":
+    df_lb = clean_leaderboard(make_leaderboard(100_000))
+    report("排名結果 (100k 列)", df_lb, compact_leaderboard(df_lb))
+
+    df_view = parse_branch_sheet(make_branch_sheet())
+    report("分店每日資料 (31x60)", df_view, compact_branch_frame(df_view))
@@ -0,0 +1,48 @@
+# 多個 App 行程共用資料檔 (engine.shared_store)：同時啟動數個行程讀取相同分頁，比較 API 呼叫次數與耗時
+# 執行方式：python benchmarks/bench_shared_store.py [--processes 4] [--stores 20] [--latency 0.05]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine import DataEngine
+from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+from engine.worksheets import staff_for_branch
+
+
+def replica(n_stores, latency, shared_dir):
+    # 模擬一個 App 行程：讀取排行榜與所有分店/人員分頁，回傳 (API 呼叫次數, 耗時)
+    conn = SyntheticSheetsConnection(n_stores, latency=latency)
+    engine = DataEngine(conn, CONFIG_URL, snapshot_dir=tempfile.mkdtemp(prefix="bench-shared-"),
+                        shared_dir=shared_dir)
+    t0 = time.perf_counter()
+    df_config, _, _ = engine.load_system_config()
+    month_config = df_config[df_config['月份_std'] == df_config['月份_std'].max()]
+    for branch, url in zip(month_config['分店代號'], month_config['試算表網址']):
+        if branch == "ALL":
+            continue
+        for worksheet in [branch] + staff_for_branch(conn.staff, branch):
+            engine.load_data(url, worksheet, branch)
+    return conn.stats["calls"], time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'API calls':>9} {'slowest s':>10} {'mean s':>8}")
+    for mode in ("private", "shared"):
+        shared_dir = tempfile.mkdtemp(prefix="bench-shared-store-") if mode == "shared" else None
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [pool.submit(replica, args.stores, args.latency, shared_dir) for _ in range(args.processes)]
+            results = [f.result() for f in futures]
+        fetches = sum(r[0] for r in results)
+        times = [r[1] for r in results]
+        print(f"{mode:>8} {fetches:>9} {max(times):10.2f} {sum(times) / len(times):8.2f}")
+    print(f"({args.processes} 個行程，{args.stores} 家門市)")
@@ -0,0 +1,80 @@
+# clean_df_for_streamlit 比較：舊版 to_dict(records) 重建 vs. engine.frames 欄位型別修正
+# 執行方式：python benchmarks/bench_streamlit_frames.py
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine.frames import clean_df_for_streamlit
+
+
+def legacy_clean_df_for_streamlit(df):
+    if df.empty: return df
+    df = df.reset_index(drop=True)
+    try:
+        data_dict = df.to_dict(orient='records')
+        df_clean = pd.DataFrame(data_dict)
+        return df_clean
+    except:
+        return df
+
+
+def problem_frames():
+    # 過去在 st.dataframe / plotly 出過問題的資料型態
+    return {
+        "混型 object (數字+文字)": pd.DataFrame({"人員": ["小明", "小華", 3], "毛利": [1, "2", 3.5]}),
+        "object 存數字": pd.DataFrame({"毛利": pd.Series([1.0, 2.5, None], dtype=object)}),
+        "可為空整數 (有缺值)": pd.DataFrame({"門號": pd.array([1, None, 3], dtype="Int64")}),
+        "可為空整數 (無缺值)": pd.DataFrame({"門號": pd.array([1, 2, 3], dtype="Int64")}),
+        "object 存日期": pd.DataFrame({"日期": pd.Series([pd.Timestamp("2026-01-01"), None], dtype=object)}),
+        "groupby 後的非預設索引": pd.DataFrame({"分店": ["A", "B"], "毛利": [3.0, 1.0]}, index=[7, 2]),
+        "分類型態": pd.DataFrame({"分店": pd.Categorical(["A", "B", "A"]), "毛利": [1.0, 2.0, 3.0]}),
+    }
+
+
+def detail_table(n_days=31, n_metrics=80):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((n_days, n_metrics)) * 1000, columns=[f"指標{i}" for i in range(n_metrics)])
+    df.insert(0, "日期", pd.date_range("2026-01-01", periods=n_days).strftime("%Y-%m-%d"))
+    return df
+
+
+def company_top_n(n_rows=50_000, n_metrics=40):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.random((n_rows, n_metrics)), columns=[f"指標{i}" for i in range(n_metrics)])
+    df["分店"] = pd.Categorical(rng.choice([f"門市{i}" for i in range(100)], n_rows))
+    df["人員"] = [f"員工{i}" for i in range(n_rows)]
+    df["Display"] = df["分店"].astype(str) + " - " + df["人員"]
+    return df.sort_values("指標0", ascending=False)
+
+
+def measure(fn, df):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(df)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    print("== 問題資料 (需能轉成 Arrow) ==")
+    for name, df in problem_frames().items():
+        out = clean_df_for_streamlit(df)
+        pa.Table.from_pandas(out)
+        assert isinstance(out.index, pd.RangeIndex)
+        print(f"  ok  {name}: {dict(out.dtypes.astype(str))}")
+
+    print("== 效能 (時間 / 記憶體峰值) ==")
+    for name, df in {"明細表 31x80": detail_table(), "全公司 50k 列": company_top_n()}.items():
+        t_old, m_old = measure(legacy_clean_df_for_streamlit, df)
+        t_new, m_new = measure(clean_df_for_streamlit, df)
+        print(f"  {name}")
+        print(f"    legacy to_dict : {t_old * 1000:8.1f} ms  peak {m_old / 2**20:8.1f} MiB")
+        print(f"    dtype 修正     : {t_new * 1000:8.1f} ms  peak {m_new / 2**20:8.1f} MiB")
@@ -0,0 +1,119 @@
+# 戰情室效能測試：以本機假 Google Sheets (engine.synthetic) 量測冷/熱載入、切換指標與 ALL 即時彙總
+# 執行方式：python benchmarks/run_benchmarks.py [--stores 10 100 500] [--latency 0.02]
+# 每次執行的結果會附加到 benchmarks/results.jsonl，方便跨版本比較。
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from engine import DataEngine
+from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def run_size(n_stores, args):
+    conn = SyntheticSheetsConnection(n_stores, args.staff, args.months, latency=args.latency,
+                                     jitter=args.jitter, failure_rate=args.failure_rate)
+
+    def new_engine(snapshot_dir=None):
+        return DataEngine(conn, CONFIG_URL, snapshot_dir=snapshot_dir or tempfile.mkdtemp(prefix="bench-"),
+                          fanout_workers=args.workers)
+
+    month = str(conn.months[-1])
+    store = conn.stores[0]
+    person = conn.staff[store][0]
+    url = conn.branch_url(conn.months[-1], store)
+
+    def first_view(engine):
+        engine.load_system_config()
+        engine.load_data(url, store, store)
+        engine.load_data(url, person, store)
+
+    results = {}
+    snapshot_dir = tempfile.mkdtemp(prefix="bench-")
+    engine = new_engine(snapshot_dir)
+    results["cold_load_s"], _ = timed(lambda: first_view(engine))
+    results["warm_load_s"], _ = timed(lambda: first_view(engine))
+    results["restart_load_s"], _ = timed(lambda: first_view(new_engine(snapshot_dir)))
+
+    # 切換指標：每個指標各查一次個人 Top 20、門市排名、單店人員排名 (全新索引，不吃查詢記憶)
+    _, df_lb, _ = engine.load_system_config()
+    from engine.ranking import RankIndex
+    results["rank_index_build_s"], index = timed(lambda: RankIndex(df_lb))
+
+    def switch_all_metrics():
+        for metric in index.metrics:
+            index.top_people(month, metric, k=20)
+            index.store_totals(month, metric)
+            index.top_people(month, metric, k=None, branch=store)
+
+    elapsed, _ = timed(switch_all_metrics)
+    results["metric_switch_ms"] = elapsed / max(len(index.metrics), 1) * 1000
+
+    # ALL 即時彙總 (冷快取)
+    df_config, _, _ = engine.load_system_config()
+    month_config = df_config[df_config['月份_std'] == month]
+    calls_before = conn.stats["calls"]
+    results["all_view_s"], (df_all, fan_out) = timed(lambda: new_engine().load_all_branches(month_config))
+    results["all_view_api_calls"] = conn.stats["calls"] - calls_before
+    results["all_view_branches_ok"] = len(fan_out.frames)
+    results["all_view_branches_failed"] = len(fan_out.failed) + len(fan_out.timed_out)
+    results["leaderboard_rows"] = len(df_lb)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="戰情室效能測試")
+    parser.add_argument("--stores", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--staff", type=int, default=5, help="每店人數")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.02, help="每次 API 呼叫延遲 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="延遲隨機增加的上限 (秒)")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=8, help="ALL 彙總的執行緒數")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results.jsonl"))
+    args = parser.parse_args()
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": {},
+    }
+    for n_stores in args.stores:
+        results = run_size(n_stores, args)
+        record["results"][str(n_stores)] = results
+        print(f"== {n_stores} 家門市 ==")
+        for name, value in results.items():
+            print(f"  {name:<26} {value:10.3f}" if isinstance(value, float) else f"  {name:<26} {value:10d}")
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
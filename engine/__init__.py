@@ -0,0 +1,30 @@
+# 馬尼通訊戰情室 - 資料引擎 (不依賴 Streamlit，可供排程與測試直接匯入)
+# 各名稱在第一次使用時才匯入對應模組，import engine 本身不載入 pandas。
+import importlib
+
+_EXPORTS = {
+    "DataEngine": "engine.service",
+    "Instrumentation": "engine.instrument",
+    "KpiRegistry": "engine.kpi",
+    "MetricCube": "engine.cube",
+    "RankIndex": "engine.ranking",
+    "SharedFrameStore": "engine.shared_store",
+    "clean_df_for_streamlit": "engine.frames",
+    "clean_google_sheet_url": "engine.sources",
+    "clean_leaderboard": "engine.leaderboard",
+    "clean_system_config": "engine.system_config",
+    "connect_gsheets": "engine.connection",
+    "describe_parse_report": "engine.branch_sheet",
+    "load_secrets": "engine.connection",
+    "parse_branch_sheet": "engine.branch_sheet",
+    "staff_for_branch": "engine.worksheets",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'engine' has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
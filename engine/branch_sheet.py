@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+# 分頁版面：第 2 列為年/月，第 3 列為表頭，第 15 列起為每日資料 (0-based 列號)
+HEADER_ROW = 2
+DATA_START_ROW = 14
+PARSE_REPORT = "parse_report"       # 解析報告存放在 DataFrame.attrs 的鍵
+
+
+class SheetLayout:
+    """分店/人員分頁的版面規格 (0-based 列/欄號)。
+
+    header_row 所在列看起來不像表頭時 (文字欄位少於 2 個)，改在 data_start 之前自動尋找文字最多的一列。
+    """
+
+    def __init__(self, period_row=1, year_col=0, month_col=1, header_row=HEADER_ROW, data_start=DATA_START_ROW):
+        self.period_row = period_row
+        self.year_col = year_col
+        self.month_col = month_col
+        self.header_row = header_row
+        self.data_start = data_start
+
+
+DEFAULT_LAYOUT = SheetLayout()
+
+
+class ParseReport:
+    """解析時發現的問題：無法辨識的年月、無法轉成數字的儲存格、被略過的列、不存在的日期。"""
+
+    def __init__(self):
+        self.header_row = None
+        self.period = None              # (年, 月)；無法辨識時為 None，日期欄為空值 (不再預設 2026/1)
+        self.bad_cells = {}             # {欄位: 無法轉成數字的儲存格數}
+        self.skipped_rows = []          # 第一欄不是日期、但其他欄有內容的列 (原始列號)
+        self.invalid_days = []          # 日期不存在於該月的列 (原始列號)
+
+    @property
+    def ok(self):
+        return self.period is not None and not self.bad_cells and not self.skipped_rows and not self.invalid_days
+
+    def as_dict(self):
+        return {
+            "header_row": self.header_row,
+            "period": list(self.period) if self.period else None,
+            "bad_cells": dict(self.bad_cells),
+            "skipped_rows": list(self.skipped_rows),
+            "invalid_days": list(self.invalid_days),
+        }
+
+
+def describe_parse_report(report):
+    """把 df.attrs['parse_report'] 轉成給使用者看的提醒文字 (沒有問題時為空清單)。"""
+    if not report:
+        return []
+    notes = []
+    if report.get("period") is None:
+        notes.append("無法辨識分頁的年/月，日期欄留空")
+    if report.get("bad_cells"):
+        cols = "、".join(f"{col} ({n} 格)" for col, n in report["bad_cells"].items())
+        notes.append(f"以下欄位有無法轉成數字的內容，未計入：{cols}")
+    if report.get("skipped_rows"):
+        notes.append(f"略過 {len(report['skipped_rows'])} 列第一欄不是日期的資料")
+    if report.get("invalid_days"):
+        notes.append(f"{len(report['invalid_days'])} 列的日期不存在於該月")
+    return notes
+
+
+def _is_text(values):
+    # 非空且不是數字的儲存格
+    numeric = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').notna().to_numpy()
+    present = pd.notna(values) & (pd.Series(values, dtype=object).astype(str).str.strip() != "").to_numpy()
+    return present & ~numeric
+
+
+def detect_header_row(df_raw, layout=DEFAULT_LAYOUT):
+    """表頭所在列：版面指定的列若有 2 個以上文字欄位即採用，否則取資料列之前文字欄位最多的一列。"""
+    limit = min(layout.data_start, len(df_raw))
+    if layout.header_row < limit and _is_text(df_raw.iloc[layout.header_row].to_numpy(dtype=object)).sum() >= 2:
+        return layout.header_row
+    counts = [_is_text(df_raw.iloc[r].to_numpy(dtype=object)).sum() for r in range(limit)]
+    return int(np.argmax(counts)) if counts and max(counts) >= 2 else layout.header_row
+
+
+def _sheet_period(df_raw, layout):
+    try:
+        year = pd.to_numeric(df_raw.iloc[layout.period_row, layout.year_col], errors='coerce')
+        month = pd.to_numeric(df_raw.iloc[layout.period_row, layout.month_col], errors='coerce')
+    except IndexError:
+        return None
+    if pd.isna(year) or pd.isna(month) or not 1 <= month <= 12:
+        return None
+    return int(year), int(month)
+
+
+def _numeric_block(block):
+    """整塊儲存格一次轉成 float 矩陣；無法轉換者為 NaN，另回傳「有內容但無法轉換」的遮罩。"""
+    try:
+        return block.astype(float), np.zeros(block.shape, dtype=bool)
+    except (TypeError, ValueError):
+        pass
+    flat = pd.Series(block.ravel(), dtype=object)
+    values = pd.to_numeric(flat, errors='coerce').to_numpy(dtype=float)
+    present = flat.notna().to_numpy() & (flat.astype(str).str.strip() != "").to_numpy()
+    bad = present & np.isnan(values)
+    return values.reshape(block.shape), bad.reshape(block.shape)
+
+
+def _dates(period, days):
+    """日期直接由 (年, 月) + 日數計算；不是整數或超出該月天數者為 NaT。"""
+    dates = np.full(len(days), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if period is None:
+        return dates, np.zeros(len(days), dtype=bool)
+    month_start = np.datetime64(f"{period[0]:04d}-{period[1]:02d}", 'M')
+    n_days = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(int)
+    valid = (days >= 1) & (days <= n_days) & (days == np.floor(days))
+    offsets = np.where(valid, days - 1, 0).astype('timedelta64[D]')
+    dates[valid] = (month_start.astype('datetime64[D]') + offsets[valid]).astype('datetime64[ns]')
+    return dates, ~valid
+
+
+def parse_sheet(df_raw, layout=DEFAULT_LAYOUT):
+    """依版面規格解析分頁，回傳 (每日資料, ParseReport)。
+
+    - 表頭列自動確認，欄名空白 / nan / Unnamed / 重複者略過
+    - 第一個有效欄位為「日」，只保留該欄為數字的列
+    - 其餘欄位整塊一次轉數字：空白 (當日未填) 與無法轉換的內容皆為空值，後者另記入報告
+    """
+    report = ParseReport()
+    if df_raw.empty:
+        return pd.DataFrame(), report
+
+    report.header_row = header_row = detect_header_row(df_raw, layout)
+    report.period = _sheet_period(df_raw, layout)
+
+    headers = df_raw.iloc[header_row].astype(str).str.strip().to_numpy(dtype=object)
+    seen, positions = set(), []
+    for j, name in enumerate(headers):
+        if name.lower() == 'nan' or name.startswith('Unnamed') or name == "" or name in seen:
+            continue
+        seen.add(name)
+        positions.append(j)
+
+    data_start = max(layout.data_start, header_row + 1)
+    body = df_raw.iloc[data_start:]
+    if not positions or body.empty:
+        return pd.DataFrame(columns=[headers[j] for j in positions]), report
+
+    values, bad = _numeric_block(body.iloc[:, positions].to_numpy(dtype=object))
+    names = [headers[j] for j in positions]
+
+    day_ok = ~np.isnan(values[:, 0])
+    skipped = ~day_ok & (~np.isnan(values[:, 1:]) | bad[:, 1:]).any(axis=1)
+    report.skipped_rows = body.index[skipped].tolist()
+
+    values, bad, index = values[day_ok], bad[day_ok], body.index[day_ok]
+    bad_counts = bad.sum(axis=0)
+    report.bad_cells = {names[j]: int(bad_counts[j]) for j in np.flatnonzero(bad_counts)}
+
+    dates, invalid = _dates(report.period, values[:, 0])
+    if report.period is not None:
+        report.invalid_days = index[invalid].tolist()
+
+    df = pd.DataFrame(values, index=index, columns=names)
+    df['日期'] = dates
+    return df, report
+
+
+def parse_branch_sheet(df_raw, layout=DEFAULT_LAYOUT):
+    """分店/人員分頁解析：第 2 列為年/月，第 3 列為表頭，第 15 列起為每日資料；解析報告見 df.attrs['parse_report']。"""
+    df, report = parse_sheet(df_raw, layout)
+    df.attrs[PARSE_REPORT] = report.as_dict()
+    return df
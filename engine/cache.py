@@ -0,0 +1,296 @@
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from engine.instrument import Instrumentation
+
+DEFAULT_TTL = 600
+
+# --- 背景更新 (stale-while-revalidate) 預設值 ---
+DEFAULT_MAX_STALE = 6 * 3600        # 過期多久內仍先回傳舊資料 (秒)；超過則當場重讀
+DEFAULT_REFRESH_WORKERS = 2         # 同時進行的背景讀取上限 (控制 API 用量)
+DEFAULT_REFRESH_INTERVAL = 60       # 排程器巡檢間隔 (秒)
+DEFAULT_REFRESH_AHEAD = 120         # 到期前多久預先更新 (秒)
+DEFAULT_HOT_WINDOW = 1800           # 最近多久內被讀過才算熱門 (秒)
+
+# --- 記憶體上限 (超過時淘汰「使用次數 / 大小」最低的項目；固定項目不淘汰) ---
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 500
+
+# --- 快取標籤 (局部清除的範圍) ---
+LEADERBOARD_TAG = "leaderboard"
+
+
+def branch_tag(branch):
+    return f"branch:{branch}"
+
+
+def sheet_tag(branch, worksheet):
+    return f"sheet:{branch}/{worksheet}"
+
+
+def value_bytes(value):
+    """快取項目大約佔用的記憶體 (位元組)：tuple/list 逐項加總，有 memory_usage() 者 (DataFrame、RankIndex) 以其為準。"""
+    if isinstance(value, (tuple, list)):
+        return sum(value_bytes(v) for v in value)
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "loaded_at", "tags", "loader", "used_at", "nbytes", "hits", "priority", "pinned")
+
+    def __init__(self, value, loaded_at, tags, loader, nbytes=0, pinned=False):
+        self.value = value
+        self.loaded_at = loaded_at
+        self.tags = tags
+        self.loader = loader
+        self.used_at = loaded_at
+        self.nbytes = nbytes
+        self.hits = 1
+        self.priority = 0.0
+        self.pinned = pinned
+
+
+class LoaderCache:
+    """行程內共用的資料快取：依標籤 (分店/人員/排行榜) 局部失效，並合併同時發生的相同讀取 (single-flight)。
+
+    回傳的 DataFrame 由所有 session 共用，呼叫端不可就地修改。
+    命中/未命中/淘汰次數依鍵的第一個元素 (讀取器名稱) 分別記入 instrument。
+
+    refresh_workers > 0 時啟用 stale-while-revalidate：過期 (但未超過 max_stale) 的項目先回傳舊資料，
+    同時在背景重讀，讀完才整筆替換；start_refresher() 另可在熱門項目到期前主動更新。
+
+    max_bytes / max_entries (None 表示不限制)：寫入後超過上限時，依 GDSF 淘汰優先度最低的項目——
+    優先度 = 基準值 + 使用次數 / 大小，基準值隨淘汰逐步提高，久未使用的大型分頁會先被移除。
+    帶有 pinned 標籤的項目 (系統配置 / 排行榜) 計入用量但不淘汰；剛寫入的項目本身也不會被淘汰。
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, instrument=None, max_stale=DEFAULT_MAX_STALE, refresh_workers=0,
+                 max_bytes=None, max_entries=None, pinned=(LEADERBOARD_TAG,)):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.pinned = frozenset(pinned)
+        self.instrument = instrument or Instrumentation()
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._bytes = 0
+        self._floor = 0.0               # GDSF 基準值：最近一次被淘汰項目的優先度
+        self._budget_evictions = 0
+        self._inflight = {}
+        self._discard = set()
+        self._pool = None
+        if refresh_workers:
+            self._pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="cache-refresh")
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def get(self, key, loader, tags=()):
+        loader_name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                now = time.monotonic()
+                entry.used_at = now
+                entry.hits += 1
+                entry.priority = self._priority(entry)
+                age = now - entry.loaded_at
+                if age < self.ttl:
+                    self.instrument.count(loader_name, "hit")
+                    return entry.value
+                if self._pool is not None and age < self.max_stale:
+                    # 先給舊資料，背景重讀
+                    self.instrument.count(loader_name, "stale")
+                    self._schedule(key, loader, entry.tags)
+                    return entry.value
+                self.instrument.count(loader_name, "evict")
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[key] = (Future(), frozenset(tags))
+
+        future, tags = flight
+        if not owner:
+            # 已有其他 session 正在讀同一份資料，等它的結果
+            self.instrument.count(loader_name, "shared")
+            return future.result()
+
+        self.instrument.count(loader_name, "miss")
+        return self._load(key, loader, flight)
+
+    def _load(self, key, loader, flight):
+        future, tags = flight
+        try:
+            value = loader()
+            nbytes = value_bytes(value)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+                self._discard.discard(key)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if key in self._discard:
+                # 讀取期間被要求更新，這份結果只交給等待者，不寫入快取
+                self._discard.discard(key)
+            else:
+                entry = _Entry(value, time.monotonic(), tags, loader, nbytes, pinned=bool(tags & self.pinned))
+                previous = self._remove(key)
+                if previous is not None:
+                    entry.used_at = previous.used_at
+                    entry.hits = previous.hits
+                entry.priority = self._priority(entry)
+                self._entries[key] = entry
+                self._bytes += nbytes
+                self._enforce_budget(keep=key)
+        future.set_result(value)
+        return value
+
+    # --- 記憶體上限 (呼叫端須持有 self._lock) ---
+    def _priority(self, entry):
+        return self._floor + entry.hits / max(entry.nbytes, 1)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+        return entry
+
+    def _over_budget(self):
+        return ((self.max_bytes is not None and self._bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) > self.max_entries))
+
+    def _enforce_budget(self, keep):
+        while self._over_budget():
+            victims = [(e.priority, k) for k, e in self._entries.items() if not e.pinned and k != keep]
+            if not victims:
+                break
+            priority, key = min(victims)
+            self._floor = priority
+            self._remove(key)
+            self._budget_evictions += 1
+            self.instrument.count(key[0], "evict")
+
+    def _schedule(self, key, loader, tags):
+        # 呼叫端須持有 self._lock；同一鍵已在讀取中則不重複排入
+        if key in self._inflight:
+            return False
+        flight = self._inflight[key] = (Future(), frozenset(tags))
+        self.instrument.count(key[0], "refresh")
+        self._pool.submit(self._refresh, key, loader, flight)
+        return True
+
+    def _refresh(self, key, loader, flight):
+        try:
+            self._load(key, loader, flight)
+        except Exception:
+            # 背景更新失敗：保留舊資料，下次過期或巡檢時再試
+            pass
+
+    # --- 主動更新排程 ---
+    def refresh_due(self, ahead=DEFAULT_REFRESH_AHEAD, hot_window=DEFAULT_HOT_WINDOW, limit=None):
+        """把即將到期 (ahead 秒內) 且最近被讀過 (hot_window 秒內) 的項目排入背景重讀，最近使用者優先；回傳排入數量。"""
+        if self._pool is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                (key, entry) for key, entry in self._entries.items()
+                if now - entry.loaded_at >= self.ttl - ahead and now - entry.used_at <= hot_window
+            ]
+            due.sort(key=lambda item: item[1].used_at, reverse=True)
+            scheduled = 0
+            for key, entry in due:
+                if limit is not None and scheduled >= limit:
+                    break
+                scheduled += self._schedule(key, entry.loader, entry.tags)
+        return scheduled
+
+    def start_refresher(self, interval=DEFAULT_REFRESH_INTERVAL, ahead=DEFAULT_REFRESH_AHEAD,
+                        hot_window=DEFAULT_HOT_WINDOW, limit=None, leader=None):
+        """啟動背景巡檢執行緒 (每 interval 秒一次)；重複呼叫不會多開。
+
+        leader() 回傳 False 時該次巡檢略過 (多個行程共用資料時只由一個行程主動更新)。
+        """
+        if self._pool is None or self._refresher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                if leader is None or leader():
+                    self.refresh_due(ahead, hot_window, limit)
+
+        self._refresher = threading.Thread(target=run, name="cache-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- 查詢 ---
+    def age(self, key):
+        """項目已存在多久 (秒)；不在快取中時為 None。"""
+        entry = self._entries.get(key)
+        return None if entry is None else time.monotonic() - entry.loaded_at
+
+    def refreshing(self, key):
+        return key in self._inflight
+
+    def usage(self):
+        """目前用量：項目數、位元組 (含固定項目)、上限、因超過上限而淘汰的次數，以及各讀取器的分項。"""
+        with self._lock:
+            loaders = {}
+            pinned_entries = pinned_bytes = 0
+            for key, entry in self._entries.items():
+                item = loaders.setdefault(key[0], {"entries": 0, "bytes": 0})
+                item["entries"] += 1
+                item["bytes"] += entry.nbytes
+                if entry.pinned:
+                    pinned_entries += 1
+                    pinned_bytes += entry.nbytes
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "pinned_entries": pinned_entries,
+                "pinned_bytes": pinned_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "budget_evictions": self._budget_evictions,
+                "loaders": loaders,
+            }
+
+    # --- 失效 ---
+    def keys(self, tag=None):
+        """目前的項目與讀取中的鍵 (可只取帶有指定標籤者)。"""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if tag is None or tag in e.tags]
+            keys.extend(k for k, (_, tags) in self._inflight.items() if k not in self._entries and (tag is None or tag in tags))
+            return keys
+
+    def invalidate(self, tag):
+        """清除帶有指定標籤的項目，回傳清除數量。"""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if tag in e.tags]
+            for k in keys:
+                self._remove(k)
+                self.instrument.count(k[0], "evict")
+            self._discard.update(k for k, (_, tags) in self._inflight.items() if tag in tags)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            count = len(self._entries)
+            for k in self._entries:
+                self.instrument.count(k[0], "evict")
+            self._entries.clear()
+            self._bytes = 0
+            self._discard.update(self._inflight)
+        return count
@@ -0,0 +1,14 @@
+def connect_gsheets(name="gsheets"):
+    """建立 Google Sheets 連線。streamlit / streamlit_gsheets 在這裡才匯入，引擎其他部分不依賴 Streamlit。"""
+    import streamlit as st
+    from streamlit_gsheets import GSheetsConnection
+
+    return st.connection(name, type=GSheetsConnection)
+
+
+def load_secrets(path=".streamlit/secrets.toml"):
+    """在 Streamlit 之外 (排程、測試) 讀取與 App 相同的 secrets.toml。"""
+    import tomllib
+
+    with open(path, "rb") as f:
+        return tomllib.load(f)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+MONTH, STORE, PERSON = '月份', '分店', '人員'
+
+
+class MetricCube:
+    """月份 × 分店 × 人員 的指標立方體：每次載入排行榜時彙總一次，之後各視圖直接切片。
+
+    - people：(月份, 分店, 人員) 層級，同一人重複的列已加總
+    - stores：(月份, 分店) 門市彙總
+    - company：月份 全公司彙總
+    索引皆已排序，切片為 O(log n)，與排行榜列數無關。
+    """
+
+    def __init__(self, months, stores, persons, values, metrics):
+        self.metrics = list(metrics)
+        frame = pd.DataFrame(np.asarray(values, dtype=float).reshape(len(months), len(self.metrics)), columns=self.metrics)
+        if len(frame):
+            keys = [pd.Series(months, name=MONTH), pd.Series(stores, name=STORE), pd.Series(persons, name=PERSON)]
+            self.people = frame.groupby(keys, sort=True).sum()
+        else:
+            index = pd.MultiIndex.from_arrays([[], [], []], names=[MONTH, STORE, PERSON])
+            self.people = pd.DataFrame(columns=self.metrics, index=index, dtype=float)
+        self.stores = self.people.groupby(level=[MONTH, STORE], sort=True).sum()
+        self.company = self.people.groupby(level=MONTH, sort=True).sum()
+
+    def memory_usage(self, deep=True):
+        return sum(int(frame.memory_usage(deep=deep).sum()) for frame in (self.people, self.stores, self.company))
+
+    @property
+    def months(self):
+        return self.company.index.tolist()
+
+    def _slice(self, frame, key):
+        try:
+            return frame.loc[key]
+        except KeyError:
+            return frame.iloc[:0].droplevel(list(range(len(key) if isinstance(key, tuple) else 1)))
+
+    def people_in(self, month, store=None):
+        """該月 (某分店) 的人員指標；未指定分店時索引為 (分店, 人員)。"""
+        return self._slice(self.people, month if store is None else (month, store))
+
+    def stores_in(self, month):
+        """該月各分店的指標彙總，索引為分店。"""
+        return self._slice(self.stores, month)
+
+    def company_in(self, month):
+        """該月全公司的指標彙總 (Series)；沒有資料時各指標為 0。"""
+        if month in self.company.index:
+            return self.company.loc[month]
+        return pd.Series(0.0, index=self.metrics)
+
+    def series(self, metric, store=None):
+        """逐月走勢 (月增比較用)：全公司或單一分店，索引為月份。"""
+        if store is None:
+            return self.company[metric]
+        values = self.stores[metric]
+        return values[values.index.get_level_values(STORE) == store].droplevel(STORE)
@@ -0,0 +1,243 @@
+# 戰情室批次匯出：指定月份，為每個分店 (全店總表 + 各人員) 與 ALL 產生報表
+# 執行方式：python -m engine.export --month 2026-10 [--format html xlsx] [--workers 8] [--out exports]
+# 資料在主行程讀取一次 (平行讀取各分店)，再交給多個行程同時產生報表。
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html import escape
+
+from engine.fanout import DEFAULT_MAX_WORKERS, load_branches
+from engine.sources import clean_google_sheet_url
+from engine.worksheets import staff_for_branch
+
+FORMATS = ("html", "xlsx")
+STORE_TOTAL = "全店總表"
+_UNSAFE = re.compile(r'[\\/:*?"<>|]')
+
+
+class ExportJob:
+    __slots__ = ("branch", "person", "worksheet")
+
+    def __init__(self, branch, person, worksheet):
+        self.branch = branch
+        self.person = person
+        self.worksheet = worksheet
+
+    @property
+    def key(self):
+        return (self.branch, self.worksheet)
+
+
+def collect(engine, month, branch_staff, branches=None, fetch_workers=DEFAULT_MAX_WORKERS):
+    """讀取該月所有需要的資料，回傳 (jobs, frames, 排名結果, 讀取失敗的分店, 讀取失敗的分頁)。
+
+    frames 以 (分店, 分頁) 為鍵；單一分頁讀取失敗不影響同分店的其他分頁，以 {(分店, 人員): 錯誤} 回報。
+    """
+    df_config, df_lb, _ = engine.load_system_config()
+    month_config = df_config[df_config['月份_std'] == month]
+    if month_config.empty:
+        available = ", ".join(sorted(df_config['月份_std'].dropna().unique(), reverse=True))
+        raise ValueError(f"系統配置表中沒有 {month} (可用月份: {available})")
+
+    urls = {}
+    for branch, url in zip(month_config['分店代號'], month_config['試算表網址']):
+        if branch not in urls and (branches is None or branch in branches):
+            urls[branch] = clean_google_sheet_url(url)
+
+    jobs = []
+    for branch in urls:
+        jobs.append(ExportJob(branch, STORE_TOTAL, branch))
+        if branch != "ALL":
+            jobs.extend(ExportJob(branch, person, person) for person in staff_for_branch(branch_staff, branch))
+
+    unread = {}
+
+    def load_branch(branch, url):
+        branch_jobs = [job for job in jobs if job.branch == branch]
+        engine.prefetch_branch(url, branch, [job.worksheet for job in branch_jobs])
+        sheets = {}
+        for job in branch_jobs:
+            try:
+                sheets[job.worksheet] = engine.load_data(url, job.worksheet, branch)
+            except Exception as e:
+                unread[(branch, job.person)] = str(e)
+        return sheets
+
+    fan_out = load_branches(urls, load_branch, max_workers=fetch_workers, timeout=float("inf"))
+    frames = {(branch, ws): df for branch, sheets in fan_out.frames.items() for ws, df in sheets.items()}
+    jobs = [job for job in jobs if job.key in frames]
+    return jobs, frames, df_lb, fan_out.failed, unread
+
+
+# --- 報表產生 (在子行程中執行；資料於行程啟動時收到一次) ---
+_shared = {}
+
+
+def _init_worker(month, frames, df_lb, kpi_specs):
+    from engine.kpi import KpiRegistry
+    from engine.ranking import RankIndex
+
+    _shared.update(month=month, frames=frames, kpis=KpiRegistry(kpi_specs), lb_index=RankIndex(df_lb))
+
+
+def _figure_html(fig, include_js):
+    return fig.to_html(full_html=False, include_plotlyjs="cdn" if include_js else False)
+
+
+def _render_html(job, df_view, kpi_values, df_rank, rank_title):
+    import plotly.express as px
+
+    month, kpis = _shared["month"], _shared["kpis"]
+    title = f"{month} {job.branch} - {job.person}"
+    parts = [f"<html><head><meta charset='utf-8'><title>{escape(title)}</title></head><body>",
+             f"<h1>📊 {escape(title)} 戰情報表</h1>"]
+
+    for section, specs in kpis.sections():
+        cells = "".join(f"<td><b>{escape(spec.name)}</b><br>{escape(spec.format(kpi_values[spec.name]))}</td>" for spec in specs)
+        parts.append(f"<h3>{escape(section)}</h3><table border='1' cellpadding='6'><tr>{cells}</tr></table>")
+
+    include_js = True
+    if '日期' in df_view.columns and '毛利' in df_view.columns:
+        daily = df_view.groupby('日期')['毛利'].sum().reset_index().sort_values('日期')
+        fig = px.line(daily, x='日期', y='毛利', markers=True, title="📈 日毛利趨勢")
+        fig.update_xaxes(tickformat="%m/%d")
+        parts.append(_figure_html(fig, include_js))
+        include_js = False
+
+    if not df_rank.empty:
+        fig = px.bar(df_rank, x='毛利', y='Display' if job.branch == "ALL" else '人員', orientation='h', text='毛利', title=rank_title)
+        fig.update_layout(yaxis={'type': 'category', 'categoryorder': 'total ascending'}, height=500)
+        fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
+        parts.append(_figure_html(fig, include_js))
+
+    df_display = df_view.copy()
+    if '日期' in df_display.columns:
+        df_display['日期'] = df_display['日期'].dt.strftime('%Y-%m-%d')
+    parts.append("<h3>詳細資料</h3>" + df_display.to_html(index=False, na_rep=""))
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def _write_xlsx(path, job, df_view, kpi_values, df_rank):
+    import pandas as pd
+
+    kpis = _shared["kpis"]
+    df_kpi = pd.DataFrame(
+        [(spec.section, spec.name, kpi_values[spec.name]) for spec in kpis.specs], columns=["區塊", "指標", "數值"]
+    )
+    df_display = df_view.copy()
+    if '日期' in df_display.columns:
+        df_display['日期'] = df_display['日期'].dt.strftime('%Y-%m-%d')
+    with pd.ExcelWriter(path) as writer:
+        df_kpi.to_excel(writer, sheet_name="KPI", index=False)
+        df_display.to_excel(writer, sheet_name="每日資料", index=False)
+        df_rank.to_excel(writer, sheet_name="排行榜", index=False)
+
+
+def render_job(job, formats, out_dir):
+    """產生單一 (分店, 人員) 的報表檔案，回傳寫出的路徑清單。"""
+    month, lb_index = _shared["month"], _shared["lb_index"]
+    df_view = _shared["frames"][job.key]
+    kpi_values = _shared["kpis"].evaluate(df_view)
+
+    if '毛利' not in lb_index.metrics:
+        import pandas as pd
+        df_rank, rank_title = pd.DataFrame(), ""
+    elif job.branch == "ALL":
+        df_rank, rank_title = lb_index.top_people(month, '毛利', k=20), "🏆 全公司 Top 20 - 毛利"
+    else:
+        df_rank, rank_title = lb_index.top_people(month, '毛利', k=None, branch=job.branch), f"🏆 {job.branch} 人員排名 - 毛利"
+
+    target_dir = os.path.join(out_dir, _UNSAFE.sub("_", job.branch))
+    os.makedirs(target_dir, exist_ok=True)
+    base = os.path.join(target_dir, _UNSAFE.sub("_", job.person))
+    written = []
+    if "html" in formats:
+        with open(base + ".html", "w", encoding="utf-8") as f:
+            f.write(_render_html(job, df_view, kpi_values, df_rank, rank_title))
+        written.append(base + ".html")
+    if "xlsx" in formats:
+        _write_xlsx(base + ".xlsx", job, df_view, kpi_values, df_rank)
+        written.append(base + ".xlsx")
+    return written
+
+
+def export_month(engine, month, branch_staff, out_dir, formats=("html",), workers=None, branches=None,
+                 fetch_workers=DEFAULT_MAX_WORKERS, log=print):
+    """匯出整個月份；回傳 (寫出的檔案數, 讀取失敗的分店, 讀取或產生失敗的報表 {(分店, 人員): 錯誤})。"""
+    t0 = time.perf_counter()
+    jobs, frames, df_lb, failed, unread = collect(engine, month, branch_staff, branches, fetch_workers)
+    log(f"已讀取 {len(frames)} 個分頁 ({time.perf_counter() - t0:.1f} 秒)，開始產生 {len(jobs)} 份報表")
+    for branch, error in failed.items():
+        log(f"⚠️ {branch} 讀取失敗：{error}")
+
+    written, errors = 0, dict(unread)
+    init_args = (month, frames, df_lb, engine.kpis.specs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+        futures = {pool.submit(render_job, job, formats, out_dir): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            try:
+                written += len(future.result())
+            except Exception as e:
+                errors[(job.branch, job.person)] = str(e)
+            if done % 50 == 0 or done == len(jobs):
+                log(f"  {done}/{len(jobs)} ({time.perf_counter() - t0:.1f} 秒)")
+    return written, failed, errors
+
+
+def _check_formats(formats):
+    if "xlsx" in formats:
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            raise SystemExit("匯出 xlsx 需要 openpyxl：pip install openpyxl")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m engine.export", description="批次匯出各分店 / 人員的月報表")
+    parser.add_argument("--month", required=True, help="月份 (YYYY-MM，需存在於系統配置表)")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    parser.add_argument("--out", default="exports", help="輸出目錄 (會再建立月份子目錄)")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["html"])
+    parser.add_argument("--workers", type=int, default=None, help="產生報表的行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_MAX_WORKERS, help="同時讀取的分店數")
+    parser.add_argument("--branches", nargs="+", help="只匯出這些分店 (預設全部)")
+    parser.add_argument("--synthetic", type=int, metavar="STORES", help="試跑：改用 N 家門市的假資料 (不連線)")
+    args = parser.parse_args(argv)
+    _check_formats(args.format)
+
+    import tempfile
+
+    from engine.service import DataEngine
+
+    if args.synthetic:
+        from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+        conn = SyntheticSheetsConnection(args.synthetic)
+        engine = DataEngine(conn, CONFIG_URL, snapshot_dir=tempfile.mkdtemp(prefix="export-"))
+        branch_staff = conn.staff
+    else:
+        from engine.connection import connect_gsheets, load_secrets
+        secrets = load_secrets(args.secrets)
+        secrets["refresh"] = {"enabled": False}
+        engine = DataEngine.from_secrets(connect_gsheets(), secrets)
+        branch_staff = secrets.get("branch_staff", {})
+
+    out_dir = os.path.join(args.out, args.month)
+    t0 = time.perf_counter()
+    try:
+        written, failed, errors = export_month(engine, args.month, branch_staff, out_dir, args.format, args.workers,
+                                               args.branches, args.fetch_workers)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for (branch, person), error in errors.items():
+        print(f"❌ {branch} - {person}：{error}")
+    print(f"完成：{written} 個檔案寫入 {out_dir}，耗時 {time.perf_counter() - t0:.1f} 秒")
+    return 1 if failed or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
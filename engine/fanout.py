@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from engine.kpi import KpiRegistry
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 20
+
+
+class FanOutResult:
+    def __init__(self, frames, failed, timed_out, elapsed, durations):
+        self.frames = frames          # {分店: DataFrame}
+        self.failed = failed          # {分店: 錯誤訊息}
+        self.timed_out = timed_out    # [分店]
+        self.elapsed = elapsed        # 整體耗時 (秒)
+        self.durations = durations    # {分店: 單店耗時 (秒)}
+
+    @property
+    def complete(self):
+        return not self.failed and not self.timed_out
+
+
+def load_branches(branch_urls, load, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT):
+    """以有上限的執行緒池同時讀取各分店試算表。
+
+    load(branch, url) 回傳該店的 DataFrame；每店自開始讀取起計時，超過 timeout 秒即放棄並列入 timed_out，
+    其餘分店照常回傳 (部分結果)。
+    """
+    t0 = time.perf_counter()
+    started, durations = {}, {}
+    frames, failed, timed_out = {}, {}, []
+
+    def run(branch, url):
+        started[branch] = time.perf_counter()
+        try:
+            return load(branch, url)
+        finally:
+            durations[branch] = time.perf_counter() - started[branch]
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout")
+    try:
+        pending = {pool.submit(run, b, u): b for b, u in branch_urls.items()}
+        while pending:
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                branch = pending.pop(future)
+                try:
+                    frames[branch] = future.result()
+                except Exception as e:
+                    failed[branch] = str(e)
+            now = time.perf_counter()
+            for future, branch in list(pending.items()):
+                if branch in started and now - started[branch] > timeout:
+                    # 執行緒無法強制中止，只是不再等它
+                    del pending[future]
+                    timed_out.append(branch)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return FanOutResult(frames, failed, timed_out, time.perf_counter() - t0, durations)
+
+
+def merge_branch_frames(frames, kpis=None):
+    """把各分店的每日資料合併成全公司視圖：同一日期的指標依 KPI 彙總方式合併。
+
+    mean (比率類) 取當日有填寫分店的平均，其餘 (sum / last 累計類) 加總；kpis 預設為預設看板。
+    """
+    frames = [df for df in frames if not df.empty and '日期' in df.columns]
+    if not frames:
+        return pd.DataFrame()
+
+    day_col = frames[0].columns[0]
+    metric_cols = []
+    for df in frames:
+        metric_cols.extend(c for c in df.columns[1:] if c != '日期' and c not in metric_cols)
+
+    kpis = kpis or KpiRegistry()
+    rate_cols = {spec.column for spec in kpis.specs if spec.agg == "mean"}
+    how = {c: "mean" if c in rate_cols else "sum" for c in metric_cols}
+
+    combined = pd.concat([df.reindex(columns=['日期'] + metric_cols) for df in frames], ignore_index=True)
+    merged = combined.groupby('日期', as_index=False).agg(how)
+    merged.insert(0, day_col, merged['日期'].dt.day.astype(float))
+    return merged[[day_col] + metric_cols + ['日期']]
@@ -0,0 +1,48 @@
+import pandas as pd
+
+_NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "decimal"}
+_DATETIME_KINDS = {"datetime", "datetime64", "date"}
+_MIXED_KINDS = {"mixed", "mixed-integer", "bytes"}
+
+
+def _arrow_safe_column(s):
+    """回傳修正後的欄位；不需修正時回傳 None。"""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return None
+    if pd.api.types.is_extension_array_dtype(s.dtype) and pd.api.types.is_numeric_dtype(s.dtype):
+        # 可為空整數 (Int64 等)：有缺值轉 float64 (NA -> NaN)，否則轉回 numpy 原生型別
+        if s.hasnans:
+            return s.astype("float64")
+        return s.astype(s.dtype.numpy_dtype)
+    if s.dtype != object:
+        return None
+
+    kind = pd.api.types.infer_dtype(s, skipna=True)
+    if kind in _NUMERIC_KINDS:
+        return pd.to_numeric(s, errors="coerce")
+    if kind in _DATETIME_KINDS:
+        return pd.to_datetime(s, errors="coerce")
+    if kind in _MIXED_KINDS:
+        # 混型欄位 (數字與文字夾雜) 統一轉文字，缺值保留
+        return s.where(s.isna(), s.astype(str))
+    return None
+
+
+def clean_df_for_streamlit(df):
+    """修正 Arrow 序列化問題 (object 混型、可為空整數、非預設索引)，只替換有問題的欄位，不複製整份資料。"""
+    if df.empty: return df
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        df = df.reset_index(drop=True)
+
+    fixes = {}
+    for i, (_, s) in enumerate(df.items()):
+        fixed = _arrow_safe_column(s)
+        if fixed is not None:
+            fixes[i] = fixed
+    if not fixes:
+        return df
+
+    df = df.copy(deep=False)
+    for i, fixed in fixes.items():
+        df.isetitem(i, fixed)
+    return df
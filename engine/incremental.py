@@ -0,0 +1,181 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from engine.branch_sheet import DATA_START_ROW, PARSE_REPORT
+from engine.instrument import frame_bytes
+from engine.sources import spreadsheet_id
+
+RECONCILE_INTERVAL = timedelta(hours=1)
+BUDGET_SHARE = 0.25     # 增量狀態佔整體快取記憶體上限的比例 (其餘給 LoaderCache)
+
+
+class _SheetState:
+    __slots__ = ("header_block", "days", "parsed", "n_rows", "width", "period", "reconciled_at", "nbytes")
+
+
+def _day_numbers(first_col):
+    return pd.to_numeric(first_col, errors='coerce').to_numpy(dtype=float)
+
+
+def _sheet_period(parsed):
+    dates = parsed['日期'].dropna() if '日期' in parsed.columns else pd.Series(dtype='datetime64[ns]')
+    if dates.empty:
+        return None
+    return dates.iloc[0].year, dates.iloc[0].month
+
+
+def _merge_report(kept, tail, resume):
+    """合併整頁解析與尾段解析的報告：resume 之前的列沿用整頁結果，之後以尾段為準 (列號換回分頁原始列號)。
+
+    無法轉數字的儲存格只有各欄的總數，取兩者較大者 (可能少算，但尾段新出現的問題一定會顯示)。
+    """
+    if not kept or not tail:
+        return kept or tail
+    shift = resume - DATA_START_ROW
+    merged = dict(kept)
+    for name in ("skipped_rows", "invalid_days"):
+        merged[name] = [r for r in kept[name] if r < resume] + [r + shift for r in tail[name]]
+    merged["bad_cells"] = {
+        col: max(kept["bad_cells"].get(col, 0), tail["bad_cells"].get(col, 0))
+        for col in {**kept["bad_cells"], **tail["bad_cells"]}
+    }
+    return merged
+
+
+class IncrementalSheetLoader:
+    """每日分頁的增量讀取：記住上次解析好的整月資料，之後只抓「今天那一列」起的新資料列並合併。
+
+    - 每隔 reconcile_interval 做一次整頁讀取，修正先前日期被回頭修改的情況
+    - 過去月份的分頁只在上層偵測到試算表有異動時才會被要求讀取，一律整頁讀取
+    load() 回傳 (解析結果, 是否為整頁讀取)；解析結果與 parse(整頁) 相同 (列索引為分頁中的原始列號)。
+    只抓尾段合併的結果可能漏掉較早日期的修改，呼叫端不應把它當成該版本的完整資料存檔。
+    最多記住 max_states 個分頁、合計 max_bytes 位元組 (None 表示不限制)，超過時移除最久未讀的分頁，下次改為整頁讀取。
+    """
+
+    def __init__(self, source, reconcile_interval=RECONCILE_INTERVAL, clock=datetime.now, max_states=None,
+                 max_bytes=None):
+        self.source = source
+        self.reconcile_interval = reconcile_interval
+        self.clock = clock
+        self.max_states = max_states
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+        self._bytes = 0
+        self.stats = {"full": 0, "incremental": 0, "rows_fetched": 0}
+
+    def _full(self, key, spreadsheet, worksheet, parse, now, read=None):
+        df_raw = read() if read is not None else None
+        if df_raw is None:
+            df_raw = self.source.read(spreadsheet, worksheet, header=None)
+        with self.source.instrument.stage("incremental.parse", worksheet=worksheet, mode="full"):
+            parsed = parse(df_raw)
+
+        state = _SheetState()
+        state.header_block = df_raw.iloc[:DATA_START_ROW]
+        state.days = _day_numbers(df_raw.iloc[DATA_START_ROW:, 0]) if df_raw.shape[1] else np.array([])
+        state.parsed = parsed
+        state.n_rows = len(df_raw)
+        state.width = df_raw.shape[1]
+        state.period = _sheet_period(parsed)
+        state.reconciled_at = now
+        with self._lock:
+            self._store(key, state)
+            self.stats["full"] += 1
+            self.stats["rows_fetched"] += len(df_raw)
+        return parsed, True
+
+    def _store(self, key, state):
+        # 呼叫端須持有 self._lock；剛寫入的分頁本身不會被移除
+        state.nbytes = (frame_bytes(state.parsed) or 0) + (frame_bytes(state.header_block) or 0) + state.days.nbytes
+        previous = self._states.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._states[key] = state
+        self._bytes += state.nbytes
+        while len(self._states) > 1 and (
+            (self.max_states is not None and len(self._states) > self.max_states)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, dropped = self._states.popitem(last=False)
+            self._bytes -= dropped.nbytes
+
+    def memory_usage(self):
+        """記住的分頁數與其解析結果 / 表頭區塊佔用的位元組。"""
+        with self._lock:
+            return {"states": len(self._states), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def forget(self, spreadsheet=None):
+        """忘記某個試算表 (None 為全部) 的分頁狀態，下次改為整頁讀取。"""
+        sid = None if spreadsheet is None else spreadsheet_id(spreadsheet)
+        with self._lock:
+            for key in [k for k in self._states if sid is None or k[0] == sid]:
+                self._bytes -= self._states.pop(key).nbytes
+
+    def _resume_row(self, state, now):
+        """本月分頁從哪一列開始重抓 (今天或之後的第一個日期列)；都沒有時只抓新增的列。"""
+        pending = np.flatnonzero(state.days >= now.day)
+        return DATA_START_ROW + int(pending[0]) if len(pending) else state.n_rows
+
+    def _tail_state(self, key, now):
+        """下一次讀取若只需抓尾段，回傳分頁狀態；需要整頁讀取時回傳 None。"""
+        state = self._states.get(key)
+        if state is None or now - state.reconciled_at >= self.reconcile_interval:
+            return None
+        if state.period is None or state.period != (now.year, now.month):
+            return None
+        return state
+
+    def tail_range(self, spreadsheet, worksheet):
+        """下一次 load() 會讀取的尾段 (起始列, 欄數)；需要整頁讀取時回傳 None。供批次預讀使用。"""
+        now = self.clock()
+        state = self._tail_state((spreadsheet_id(spreadsheet), worksheet), now)
+        if state is None or not state.width:
+            return None
+        return self._resume_row(state, now), state.width
+
+    def load(self, spreadsheet, worksheet, parse, read=None, force=False, read_tail=None):
+        """read 可提供已讀回的整頁資料 (例如批次讀取的結果)，回傳 None 時自行讀取；只用於整頁讀取。force=True 一律整頁讀取。
+
+        read_tail(起始列) 可提供已預讀的尾段 (見 tail_range)，回傳 None 時自行讀取。
+        """
+        key = (spreadsheet_id(spreadsheet), worksheet)
+        now = self.clock()
+        state = None if force else self._tail_state(key, now)
+        if state is None:
+            return self._full(key, spreadsheet, worksheet, parse, now, read)
+
+        resume = self._resume_row(state, now)
+        fetched = read_tail(resume) if read_tail is not None else None
+        if fetched is None:
+            fetched = self.source.read_rows(spreadsheet, worksheet, resume, stop_col=state.width or None)
+        fetched.columns = range(fetched.shape[1])
+        with self.source.instrument.stage("incremental.parse", worksheet=worksheet, mode="tail", rows=len(fetched)):
+            new_part = parse(pd.concat([state.header_block, fetched], ignore_index=True))
+        new_part.index = new_part.index - DATA_START_ROW + resume
+
+        kept = state.parsed[state.parsed.index < resume]
+        merged = pd.concat([kept, new_part]) if len(new_part) else kept
+        merged.attrs = dict(state.parsed.attrs)
+        report = _merge_report(state.parsed.attrs.get(PARSE_REPORT), new_part.attrs.get(PARSE_REPORT), resume)
+        if report is not None:
+            merged.attrs[PARSE_REPORT] = report
+
+        new_state = _SheetState()
+        new_state.header_block = state.header_block
+        new_days = _day_numbers(fetched.iloc[:, 0]) if fetched.shape[1] else np.full(len(fetched), np.nan)
+        new_state.days = np.concatenate([state.days[:resume - DATA_START_ROW], new_days])
+        new_state.parsed = merged
+        new_state.n_rows = resume + len(fetched)
+        new_state.width = max(state.width, fetched.shape[1])
+        new_state.period = state.period
+        new_state.reconciled_at = state.reconciled_at
+        with self._lock:
+            self._store(key, new_state)
+            self.stats["incremental"] += 1
+            self.stats["rows_fetched"] += len(fetched)
+        return merged, False
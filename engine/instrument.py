@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+DEFAULT_MAX_EVENTS = 5000
+CACHE_EVENTS = ("hit", "miss", "shared", "stale", "refresh", "evict")
+
+
+def frame_bytes(df):
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return None
+
+
+class _NullStage:
+    # 關閉監測時共用的空計時器，進出都不做任何事
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def note(self, **fields):
+        pass
+
+    def frame(self, df):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("_owner", "_record", "_t0")
+
+    def __init__(self, owner, name, fields):
+        self._owner = owner
+        self._record = {"type": "stage", "stage": name, **fields}
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._record["ms"] = round((time.perf_counter() - self._t0) * 1000, 3)
+        self._record["ts"] = time.time()
+        if exc_type is not None:
+            self._record["error"] = exc_type.__name__
+        self._owner._add(self._record)
+        return False
+
+    def note(self, **fields):
+        self._record.update(fields)
+
+    def frame(self, df):
+        self._record["rows"] = len(df)
+        self._record["bytes"] = frame_bytes(df)
+
+
+class Instrumentation:
+    """熱路徑效能監測：各階段耗時、每次讀取的列數/位元組、各快取的命中/未命中/淘汰次數。
+
+    預設關閉；關閉時 stage() 回傳共用的空計時器、count() 直接返回，幾乎沒有額外成本。
+    事件只保留最近 max_events 筆，可匯出成 JSON lines 離線分析。
+    """
+
+    def __init__(self, enabled=False, max_events=DEFAULT_MAX_EVENTS):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=max_events)
+        self._cache = defaultdict(lambda: dict.fromkeys(CACHE_EVENTS, 0))
+
+    def stage(self, name, **fields):
+        if not self.enabled:
+            return NULL_STAGE
+        return _Stage(self, name, fields)
+
+    def count(self, loader, event, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._cache[loader][event] += n
+
+    def _add(self, record):
+        with self._lock:
+            self._events.append(record)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def cache_stats(self):
+        """{快取名稱: {hit, miss, shared, stale, refresh, evict}}"""
+        with self._lock:
+            return {loader: dict(counts) for loader, counts in self._cache.items()}
+
+    def summary(self):
+        """依階段彙總：次數、總耗時、平均/最大耗時、讀取列數與位元組。"""
+        stages = {}
+        for e in self.events():
+            s = stages.setdefault(e["stage"], {"stage": e["stage"], "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                               "rows": 0, "bytes": 0, "errors": 0})
+            s["calls"] += 1
+            s["total_ms"] += e["ms"]
+            s["max_ms"] = max(s["max_ms"], e["ms"])
+            s["rows"] += e.get("rows") or 0
+            s["bytes"] += e.get("bytes") or 0
+            s["errors"] += "error" in e
+        for s in stages.values():
+            s["total_ms"] = round(s["total_ms"], 3)
+            s["mean_ms"] = round(s["total_ms"] / s["calls"], 3)
+        return sorted(stages.values(), key=lambda s: s["total_ms"], reverse=True)
+
+    def to_jsonl(self):
+        """匯出所有階段事件，最後附上一行快取統計。"""
+        lines = [json.dumps(e, ensure_ascii=False, default=str) for e in self.events()]
+        lines.append(json.dumps({"type": "cache", "ts": time.time(), "loaders": self.cache_stats()}, ensure_ascii=False))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._cache.clear()
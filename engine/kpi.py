@@ -0,0 +1,122 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# sum: 加總 / mean: 有填寫日的平均 (比率類) / last: 最後一個有填寫的值 (累計類)
+AGGREGATIONS = ("sum", "mean", "last")
+
+
+class KpiSpec:
+    __slots__ = ("name", "column", "agg", "fmt", "section")
+
+    def __init__(self, name, column, agg="sum", fmt="{:,.0f}", section=""):
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"KPI {name!r} 的彙總方式 {agg!r} 不支援 (可用: {', '.join(AGGREGATIONS)})")
+        self.name = name
+        self.column = column
+        self.agg = agg
+        self.fmt = fmt
+        self.section = section
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["name"], d.get("column", d["name"]), d.get("agg", "sum"), d.get("format", "{:,.0f}"), d.get("section", ""))
+
+    def format(self, value):
+        return self.fmt.format(value)
+
+
+# --- 預設看板 (secrets.toml 有 [[kpis]] 時整份取代) ---
+_MONEY, _COUNT, _RATE = "${:,.0f}", "{:,.0f}", "{:.1f}"
+DEFAULT_KPIS = [
+    KpiSpec("總毛利", "毛利", "sum", _MONEY, "💰 營收與獲利"),
+    KpiSpec("配件營收", "配件營收", "sum", _MONEY, "💰 營收與獲利"),
+    KpiSpec("保險營收", "保險營收", "sum", _MONEY, "💰 營收與獲利"),
+    KpiSpec("門號申辦數", "門號", "sum", _COUNT, "📈 關鍵營運指標"),
+    KpiSpec("總來客數", "來客數", "sum", _COUNT, "📈 關鍵營運指標"),
+    KpiSpec("Google 評論", "GOOGLE 評論", "sum", _COUNT, "📈 關鍵營運指標"),
+    KpiSpec("生活圈加入", "生活圈", "sum", _COUNT, "📈 關鍵營運指標"),
+    KpiSpec("庫存手機", "庫存手機", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("VIVO 手機", "VIVO手機", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("蘋果手機", "蘋果手機", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("蘋果平板+手錶", "蘋果平板+手錶", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("華為穿戴", "華為穿戴", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("GPLUS 吸塵器", "GPLUS GP-S10吸塵器", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("VIVO 目標", "VIVO銷售目標", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("橙艾玻璃貼", "橙艾玻璃貼(13,14,15系列)", "sum", _COUNT, "📱 手機與硬體銷售/庫存"),
+    KpiSpec("續約累積 GAP", "遠傳續約累積GAP", "sum", _COUNT, "🔵 遠傳指標"),
+    KpiSpec("升續率", "遠傳升續率", "mean", _RATE, "🔵 遠傳指標"),
+    KpiSpec("平續率", "遠傳平續率", "mean", _RATE, "🔵 遠傳指標"),
+    KpiSpec("綜合指標", "綜合指標", "sum", _RATE, "🔵 遠傳指標"),
+]
+
+
+def _aggregate(values):
+    """一次算出每欄的 sum / mean / last；只有空值視為「當日未填」，不列入 mean / last (填 0 仍算有填寫)。"""
+    filled = np.isfinite(values)
+    counts = filled.sum(axis=0)
+    masked = np.where(filled, values, 0.0)
+    sums = masked.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, 0.0)
+    last_row = len(values) - 1 - np.argmax(filled[::-1], axis=0)
+    lasts = masked[last_row, np.arange(values.shape[1])]
+    return {"sum": sums, "mean": means, "last": lasts}
+
+
+class KpiRegistry:
+    """KPI 看板定義：名稱、來源欄位、彙總方式、顯示格式、所屬區塊。
+
+    evaluate() 把所有用到的欄位一次轉成數值矩陣後整批彙總；結果跟著該份 DataFrame 記住
+    (快取中的同一份資料重複顯示時不重算)，資料被釋放時一併清除。
+    """
+
+    def __init__(self, specs=None):
+        self.specs = list(DEFAULT_KPIS if specs is None else specs)
+        self._lock = threading.Lock()
+        self._memo = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """config 為 secrets.toml 的 [[kpis]] 清單；未設定時使用預設看板。"""
+        if not config:
+            return cls()
+        return cls([KpiSpec.from_dict(d) for d in config])
+
+    def sections(self):
+        """[(區塊名稱, [KpiSpec, ...]), ...]，依第一次出現的順序。"""
+        grouped = {}
+        for spec in self.specs:
+            grouped.setdefault(spec.section, []).append(spec)
+        return list(grouped.items())
+
+    def _compute(self, df):
+        columns = [c for c in dict.fromkeys(spec.column for spec in self.specs) if c in df.columns]
+        result = dict.fromkeys((spec.name for spec in self.specs), 0.0)
+        if not columns or df.empty:
+            return result
+        try:
+            block = df[columns].to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            block = df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        aggregated = _aggregate(block)
+        position = {c: j for j, c in enumerate(columns)}
+        for spec in self.specs:
+            j = position.get(spec.column)
+            if j is not None:
+                result[spec.name] = float(aggregated[spec.agg][j])
+        return result
+
+    def evaluate(self, df):
+        """回傳 {KPI 名稱: 數值}；欄位不存在的 KPI 為 0。"""
+        key = id(df)
+        with self._lock:
+            hit = self._memo.get(key)
+        if hit is not None and hit[0]() is df:
+            return hit[1]
+        result = self._compute(df)
+        with self._lock:
+            self._memo[key] = (weakref.ref(df, lambda _, key=key: self._memo.pop(key, None)), result)
+        return result
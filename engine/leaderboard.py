@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from engine.sources import values_frame
+
+# --- 排名結果清洗設定 ---
+CUT_OFF_MARKER = "--->勿動"
+EXCLUDE_KEYWORDS = ["總表", "ALL", "Total", "小計", "合計", "小西門"]
+SHEETS_EPOCH = pd.Timestamp("1899-12-30")
+_BLANK_VALUES = ['', 'nan', 'None']
+
+
+def _strip_and_ffill(s):
+    s = s.astype(str).str.strip()
+    s = s.replace(_BLANK_VALUES, np.nan)
+    return s.ffill()
+
+
+def _format_months(dt):
+    # 月份只有少數幾個相異值，先 factorize 再格式化，避免逐列 strftime
+    codes, uniques = pd.factorize(dt)
+    labels = pd.DatetimeIndex(uniques).strftime('%Y-%m')
+    return pd.Series(labels.take(codes, allow_fill=True, fill_value=np.nan), index=dt.index)
+
+
+def cut_off_index(columns):
+    """切刀欄位 (CUT_OFF_MARKER) 的位置，其右側為後台欄位；沒有時為 None。"""
+    for i, col_name in enumerate(columns):
+        if CUT_OFF_MARKER in str(col_name):
+            return i
+    return None
+
+
+def month_keys(values):
+    """月份欄逐列補齊 (合併儲存格只寫在區塊第一列) 後的 'YYYY-MM'，與 clean_leaderboard 的 月份_std 相同。"""
+    months = _strip_and_ffill(pd.Series(values, dtype=object))
+    return _format_months(pd.to_datetime(months, errors='coerce'))
+
+
+def read_leaderboard(source, spreadsheet, worksheet, recent_months=None):
+    """只下載排名結果需要的範圍，結果與整頁讀取 (header=0) 後再切刀相同。
+
+    1. 先讀表頭列，找出切刀欄位，其右側的後台欄位不下載
+    2. 指定 recent_months 時，再讀月份/分店兩欄找出最近 N 個月所在的列，只下載這些列
+       (月份/分店以整欄補齊後的值寫回，不依賴區塊第一列是否在範圍內)
+    表頭沒有切刀欄位且未限制月份時回傳 None，由呼叫端整頁讀取。
+    """
+    header = source.read_values(spreadsheet, worksheet, stop=1)
+    header = list(header[0]) if header else []
+    n_cols = cut_off_index(header)
+    if n_cols is None and not recent_months:
+        return None
+    if n_cols is not None:
+        header = header[:n_cols]
+
+    if not recent_months:
+        return values_frame([header] + source.read_values(spreadsheet, worksheet, start=1, stop_col=n_cols), header=0)
+
+    names = [str(name).strip() for name in header]
+    if '月份' not in names:
+        return None
+    key_pos = {name: names.index(name) for name in ('月份', '分店') if name in names}
+    key_cols = max(key_pos.values()) + 1
+    key_rows = source.read_values(spreadsheet, worksheet, start=1, stop_col=key_cols)
+    keys = pd.DataFrame([list(row) + [''] * (key_cols - len(row)) for row in key_rows], columns=range(key_cols), dtype=object)
+    months = month_keys(keys[key_pos['月份']])
+    wanted = sorted(months.dropna().unique())[-recent_months:]
+    rows = np.flatnonzero(months.isin(wanted).to_numpy())
+    if not len(rows):
+        return values_frame([header], header=0)
+
+    first, last = int(rows[0]), int(rows[-1])
+    body = source.read_values(spreadsheet, worksheet, start=1 + first, stop=2 + last, stop_col=n_cols)
+    width = max(map(len, body + [header]))
+    body = [list(row) + [''] * (width - len(row)) for row in body]
+    body += [[''] * width for _ in range(last - first + 1 - len(body))]
+    for pos in key_pos.values():
+        filled = _strip_and_ffill(keys[pos]).iloc[first:last + 1].fillna('').tolist()
+        for row, value in zip(body, filled):
+            row[pos] = value
+    keep = months.iloc[first:last + 1].isin(wanted).to_numpy()
+    return values_frame([header] + [row for row, k in zip(body, keep) if k], header=0)
+
+
+def clean_leaderboard(df_raw):
+    """排名結果清洗 (切刀 + 填補 + 來客數修復 + 排除門市彙總列)，全程向量化運算。"""
+    df_clean = df_raw.copy()
+    if df_clean.empty:
+        return df_clean
+
+    # --- 自動切除後台欄位 (切刀) ---
+    cut = cut_off_index(df_clean.columns)
+    if cut is not None:
+        df_clean = df_clean.iloc[:, :cut]
+
+    # --- 修復 1: 處理月份 ---
+    if '月份' in df_clean.columns:
+        df_clean['月份'] = _strip_and_ffill(df_clean['月份'])
+        df_clean['月份_dt'] = pd.to_datetime(df_clean['月份'], errors='coerce')
+        df_clean['月份_std'] = _format_months(df_clean['月份_dt'])
+
+    # --- 修復 2: 處理分店 ---
+    if '分店' in df_clean.columns:
+        df_clean['分店'] = _strip_and_ffill(df_clean['分店']).astype(str).str.strip()
+
+    # --- 修復 3: 處理人員 ---
+    if '人員' in df_clean.columns:
+        df_clean['人員'] = df_clean['人員'].astype(str).str.strip()
+
+    # --- 修復 4: 處理「來客數」被讀成日期 (Sheets 日期序號起算 1899-12-30) ---
+    if '來客數' in df_clean.columns:
+        if pd.api.types.is_datetime64_any_dtype(df_clean['來客數']):
+            df_clean['來客數'] = (df_clean['來客數'] - SHEETS_EPOCH).dt.days
+        df_clean['來客數'] = pd.to_numeric(df_clean['來客數'], errors='coerce').fillna(0).astype(int)
+
+    # 排除關鍵字
+    person = df_clean['人員']
+    mask_keyword = ~person.isin(EXCLUDE_KEYWORDS)
+
+    # 智慧排除：人員名稱等於分店名稱 (含去掉「店」字) 者視為門市彙總列
+    branch = df_clean['分店'].astype(str)
+    mask_smart = (person != branch.str.replace('店', '', regex=False)) & (person != df_clean['分店'])
+
+    return df_clean[mask_keyword & mask_smart]
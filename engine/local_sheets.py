@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+
+from engine.sources import spreadsheet_id
+
+
+class LocalSheetsConnection:
+    """以本機 CSV 檔模擬 GSheetsConnection：<root>/<試算表 ID>/<分頁名稱>.csv。"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _dir(self, spreadsheet):
+        return os.path.join(self.root, spreadsheet_id(spreadsheet))
+
+    def _path(self, spreadsheet, worksheet):
+        return os.path.join(self._dir(spreadsheet), f"{worksheet}.csv")
+
+    def worksheet_titles(self, spreadsheet):
+        sheet_dir = self._dir(spreadsheet)
+        if not os.path.isdir(sheet_dir):
+            raise FileNotFoundError(f"找不到試算表: {spreadsheet}")
+        return sorted(name[:-4] for name in os.listdir(sheet_dir) if name.endswith(".csv"))
+
+    def read(self, spreadsheet=None, worksheet=None, ttl=None, header=0, **options):
+        if worksheet is None:
+            worksheet = self.worksheet_titles(spreadsheet)[0]
+        path = self._path(spreadsheet, worksheet)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"找不到分頁: {worksheet}")
+        return pd.read_csv(path, header=header, **options)
+
+    def read_many(self, spreadsheet, worksheets, header=0):
+        return {ws: self.read(spreadsheet, ws, header=header) for ws in worksheets}
+
+    def read_rows(self, spreadsheet, worksheet, start, stop=None, stop_col=None):
+        df = self.read(spreadsheet, worksheet, header=None)
+        return df.iloc[start:stop, :stop_col].reset_index(drop=True)
+
+    def read_values(self, spreadsheet, worksheet, start=0, stop=None, start_col=0, stop_col=None):
+        df = self.read(spreadsheet, worksheet, header=None)
+        block = df.iloc[start:stop, start_col:stop_col].astype(object)
+        return block.where(block.notna(), "").to_numpy().tolist()
+
+    def write(self, spreadsheet, worksheet, df, header=True):
+        os.makedirs(self._dir(spreadsheet), exist_ok=True)
+        df.to_csv(self._path(spreadsheet, worksheet), index=False, header=header)
+
+    def revision(self, spreadsheet):
+        sheet_dir = self._dir(spreadsheet)
+        if not os.path.isdir(sheet_dir):
+            return None
+        return str(max((e.stat().st_mtime_ns for e in os.scandir(sheet_dir)), default=0))
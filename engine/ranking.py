@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from engine.cube import MetricCube
+from engine.schema import MONTH_KEY
+
+# 排名時固定不顯示的欄位 (其餘依原始欄位順序作為指標)
+FIXED_COLS = ['月份', '分店', '人員', '更新時間', 'Display', '月份_dt', '月份_str', '月份_std']
+DEFAULT_TOP_K = 20
+
+
+def _top_k(values, k):
+    # 只在 k 筆候選內排序，不對整份資料排序
+    if k is None or k >= len(values):
+        return np.argsort(-values, kind='stable')
+    part = np.argpartition(-values, k - 1)[:k]
+    return part[np.argsort(-values[part], kind='stable')]
+
+
+def _group_positions(keys):
+    # {鍵: 列位置陣列}，缺值的鍵不列入
+    return pd.Series(keys).groupby(keys, sort=False).indices
+
+
+class RankIndex:
+    """業績英雄榜的排名索引：每次載入排行榜時建立一次，之後切換指標/月份/分店只需查表。
+
+    - 所有指標欄位預先轉成數值矩陣 (無法轉換者視為 0)
+    - 依 (月份) 與 (月份, 分店) 預先分好列位置
+    - Display 標籤 (分店 - 人員) 預先組好
+    - 分店/人員/全公司的彙總由 MetricCube 一次算好 (self.cube)
+    查詢結果會記住，同一組條件再次查詢不重算。
+    """
+
+    def __init__(self, df_lb):
+        positions = [j for j, c in enumerate(df_lb.columns) if c not in FIXED_COLS]
+        self.metrics = [df_lb.columns[j] for j in positions]
+        self._metric_pos = {m: j for j, m in enumerate(self.metrics)}
+        self._memo = {}
+
+        if df_lb.empty or MONTH_KEY not in df_lb.columns:
+            self._values = np.zeros((0, len(self.metrics)))
+            self._month_rows, self._branch_rows = {}, {}
+            self.cube = MetricCube([], [], [], self._values, self.metrics)
+            return
+
+        self._values = np.column_stack([
+            pd.to_numeric(df_lb.iloc[:, j], errors='coerce').fillna(0).to_numpy(dtype=float) for j in positions
+        ]) if positions else np.zeros((len(df_lb), 0))
+
+        self._branch = df_lb['分店'].astype(str).to_numpy(dtype=object)
+        self._person = df_lb['人員'].astype(str).to_numpy(dtype=object)
+        self._display = self._branch + " - " + self._person
+        self._updated = df_lb['更新時間'].to_numpy(dtype=object) if '更新時間' in df_lb.columns else None
+
+        months = df_lb[MONTH_KEY].to_numpy(dtype=object)
+        self._month_rows = _group_positions(months)
+        self._branch_rows = {}
+        for month, rows in self._month_rows.items():
+            for branch, sub in _group_positions(self._branch[rows]).items():
+                self._branch_rows[(month, branch)] = rows[sub]
+
+        self.cube = MetricCube(months, self._branch, self._person, self._values, self.metrics)
+
+    def memory_usage(self, deep=True):
+        """索引本身 (數值矩陣、標籤、立方體) 佔用的位元組；查詢記憶不計。"""
+        total = self._values.nbytes + self.cube.memory_usage(deep)
+        for labels in (getattr(self, "_branch", None), getattr(self, "_person", None), getattr(self, "_display", None)):
+            if labels is not None:
+                total += int(pd.Series(labels, copy=False).memory_usage(index=False, deep=deep))
+        return total
+
+    def rows(self, month, branch=None):
+        if branch is None:
+            return self._month_rows.get(month, np.array([], dtype=int))
+        return self._branch_rows.get((month, branch), np.array([], dtype=int))
+
+    def has_rows(self, month, branch=None):
+        return len(self.rows(month, branch)) > 0
+
+    def updated_at(self, month, branch=None):
+        rows = self.rows(month, branch)
+        if self._updated is None or not len(rows):
+            return None
+        return self._updated[rows[0]]
+
+    def top_people(self, month, metric, k=DEFAULT_TOP_K, branch=None):
+        """個人排名 (由高到低)；k=None 表示全部。回傳欄位：分店、人員、Display、指標。"""
+        key = ("people", month, branch, metric, k)
+        if key not in self._memo:
+            rows = self.rows(month, branch)
+            values = self._values[rows, self._metric_pos[metric]]
+            top = rows[_top_k(values, k)]
+            self._memo[key] = pd.DataFrame({
+                '分店': self._branch[top],
+                '人員': self._person[top],
+                'Display': self._display[top],
+                metric: self._values[top, self._metric_pos[metric]],
+            })
+        return self._memo[key]
+
+    def breakdown(self, month, metric, branch=None):
+        """毛利佔比等結構圖用：全公司依分店加總，單一分店依人員加總。"""
+        if branch is None:
+            return self.store_totals(month, metric)
+        key = ("breakdown", month, branch, metric)
+        if key not in self._memo:
+            totals = self.cube.people_in(month, branch)[metric]
+            self._memo[key] = pd.DataFrame({'人員': totals.index.to_numpy(dtype=object), metric: totals.to_numpy()})
+        return self._memo[key]
+
+    def store_totals(self, month, metric):
+        """門市排名 (由高到低)：各分店指標加總。回傳欄位：分店、指標。"""
+        key = ("stores", month, metric)
+        if key not in self._memo:
+            totals = self.cube.stores_in(month)[metric]
+            values = totals.to_numpy(dtype=float)
+            order = _top_k(values, None)
+            self._memo[key] = pd.DataFrame({'分店': totals.index.to_numpy(dtype=object)[order], metric: values[order]})
+        return self._memo[key]
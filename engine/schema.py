@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+# 快照的資料格式版本；欄位型態有變動時 +1，舊快照即不再沿用
+SCHEMA_VERSION = 4
+
+MONTH_KEY = '月份'                                 # 排行榜唯一的月份欄位 ('YYYY-MM')
+CATEGORY_COLS = ['分店', '人員', '更新時間']
+_MONTH_HELPERS = ['月份_dt', '月份_std']
+_FLOAT32_EXACT = 2 ** 24                           # float32 可精確表示的整數上限
+
+
+def compact_numeric(s, fill_missing=True):
+    """數值欄位縮小型態：全為整數者用最小整數型態，其餘用 float32 (超過精度範圍時保留 float64)。
+
+    fill_missing=False 時保留空值 (無法解析的儲存格)，該欄改用浮點型態。
+    """
+    values = pd.to_numeric(s, errors='coerce')
+    if fill_missing:
+        values = values.fillna(0)
+    arr = values.to_numpy(dtype=float)
+    if np.array_equal(arr, np.round(arr)):
+        return pd.to_numeric(values.astype('int64'), downcast='integer')
+    if len(arr) and np.nanmax(np.abs(arr), initial=0) >= _FLOAT32_EXACT:
+        return values.astype('float64')
+    return values.astype('float32')
+
+
+def compact_leaderboard(df_clean):
+    """排行榜：分店/人員/更新時間改為 category，月份合併成單一 'YYYY-MM' 鍵，指標欄位縮小數值型態。"""
+    if df_clean.empty:
+        return df_clean
+    df = df_clean.drop(columns=[c for c in _MONTH_HELPERS if c in df_clean.columns])
+    if '月份_std' in df_clean.columns:
+        df[MONTH_KEY] = df_clean['月份_std'].astype('category')
+    for col in df.columns:
+        if col in CATEGORY_COLS:
+            df[col] = df[col].astype(str).astype('category')
+        elif col != MONTH_KEY:
+            df[col] = compact_numeric(df[col])
+    return df.reset_index(drop=True)
+
+
+def compact_branch_frame(df):
+    """分店/人員每日資料：日期以外的欄位縮小數值型態 (保留解析失敗的空值)。"""
+    if df.empty:
+        return df
+    df = df.copy()
+    for col in df.columns:
+        if col != '日期':
+            df[col] = compact_numeric(df[col], fill_missing=False)
+    return df
+
+
+def frame_memory(df):
+    """DataFrame 實際佔用的記憶體 (bytes，含 object 內容)。"""
+    return int(df.memory_usage(deep=True, index=True).sum())
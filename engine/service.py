@@ -0,0 +1,350 @@
+import os
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from engine.branch_sheet import parse_branch_sheet
+from engine.cache import (
+    DEFAULT_HOT_WINDOW, DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_STALE, DEFAULT_REFRESH_AHEAD,
+    DEFAULT_REFRESH_INTERVAL, DEFAULT_REFRESH_WORKERS, DEFAULT_TTL, LEADERBOARD_TAG, LoaderCache, branch_tag, sheet_tag,
+)
+from engine.fanout import DEFAULT_MAX_WORKERS, DEFAULT_TIMEOUT, load_branches, merge_branch_frames
+from engine.incremental import BUDGET_SHARE, RECONCILE_INTERVAL, IncrementalSheetLoader
+from engine.instrument import Instrumentation
+from engine.kpi import KpiRegistry
+from engine.leaderboard import clean_leaderboard, read_leaderboard
+from engine.ranking import RankIndex
+from engine.schema import SCHEMA_VERSION, compact_branch_frame, compact_leaderboard
+from engine.shared_store import SHARED_DIR, SharedFrameStore
+from engine.snapshot import SNAPSHOT_DIR, SNAPSHOT_MAX_AGE, SnapshotCache
+from engine.sources import BatchRead, BatchTailRead, SheetSource, clean_google_sheet_url
+from engine.system_config import clean_system_config
+from engine.worksheets import STORE_TOTAL_NAMES, WorksheetIndex, candidate_names
+
+
+# --- 解析後轉為精簡型態 (category / 小整數 / float32)，降低快取記憶體 ---
+def parse_leaderboard(df_raw):
+    return compact_leaderboard(clean_leaderboard(df_raw))
+
+
+def parse_branch_data(df_raw):
+    return compact_branch_frame(parse_branch_sheet(df_raw))
+
+
+_CONFIG_KEY = ("system_config",)
+_CONFIG_SHEETS = ("系統配置", "排名結果")
+
+
+def _sheet_key(url, worksheet, branch):
+    return ("sheet", url, worksheet, branch)
+
+
+class DataEngine:
+    """戰情室的資料引擎：讀取 / 解析 / 清洗 / 快取，不依賴 Streamlit，可直接用於排程與測試。
+
+    conn 為 GSheetsConnection 或任何同介面的替身 (例如 LocalSheetsConnection)。
+    回傳的 DataFrame 由所有呼叫端共用，不可就地修改。
+    """
+
+    def __init__(self, conn, config_url=None, sheet_names=None, snapshot_dir=SNAPSHOT_DIR, ttl=DEFAULT_TTL,
+                 incremental=True, reconcile_interval=RECONCILE_INTERVAL,
+                 fanout_workers=DEFAULT_MAX_WORKERS, fanout_timeout=DEFAULT_TIMEOUT, instrument=False, kpis=None,
+                 refresh_workers=0, refresh_interval=DEFAULT_REFRESH_INTERVAL, refresh_ahead=DEFAULT_REFRESH_AHEAD,
+                 hot_window=DEFAULT_HOT_WINDOW, max_stale=DEFAULT_MAX_STALE,
+                 cache_max_bytes=DEFAULT_MAX_BYTES, cache_max_entries=DEFAULT_MAX_ENTRIES, shared_dir=None,
+                 leaderboard_months=None, incremental_share=BUDGET_SHARE, snapshot_max_age=SNAPSHOT_MAX_AGE):
+        # 效能監測 (預設關閉，可隨時切換 self.instrument.enabled)
+        self.instrument = Instrumentation(enabled=instrument)
+        self.source = SheetSource(conn, self.instrument)
+        self.config_url = clean_google_sheet_url(config_url) if config_url else None
+        self.sheet_names = dict(sheet_names or {})
+        self.fanout_workers = fanout_workers
+        self.fanout_timeout = fanout_timeout
+        self.leaderboard_months = leaderboard_months or None    # 只載入排名結果最近 N 個月 (None 為全部)
+        self.kpis = KpiRegistry.from_config(kpis)
+
+        # refresh_workers > 0：過期資料先回傳舊快照並於背景更新，熱門項目到期前主動重讀
+        # 記憶體上限：超過 cache_max_bytes / cache_max_entries 時淘汰冷門分頁 (系統配置與排行榜固定保留)
+        # 啟用增量讀取時 cache_max_bytes 是兩者合計：incremental_share 給增量狀態，其餘給資料快取
+        incremental = incremental and self.source.supports_ranges()
+        incremental_bytes = None
+        if incremental and cache_max_bytes is not None:
+            incremental_bytes = int(cache_max_bytes * incremental_share)
+            cache_max_bytes -= incremental_bytes
+        self.cache = LoaderCache(ttl=ttl, instrument=self.instrument, max_stale=max_stale, refresh_workers=refresh_workers,
+                                 max_bytes=cache_max_bytes, max_entries=cache_max_entries)
+        # shared_dir：同一主機上的多個 App 行程經由共用資料檔取得同一份資料，只由其中一個行程主動更新
+        self.shared = SharedFrameStore(shared_dir, ttl, self.instrument) if shared_dir else None
+        if refresh_workers:
+            leader = self.shared.is_refresher if self.shared is not None else None
+            self.cache.start_refresher(refresh_interval, refresh_ahead, hot_window, limit=refresh_workers, leader=leader)
+        self.snapshots = SnapshotCache(self.source, snapshot_dir, version=SCHEMA_VERSION, max_age=snapshot_max_age)
+        self.worksheet_index = WorksheetIndex(self.source, os.path.join(snapshot_dir, "worksheet_index.json"))
+        # 手動清除過的快取鍵：下次讀取時略過快照的版本比對，強制重新下載
+        self._forced = set()
+        self._forced_lock = threading.Lock()
+        self.incremental = None
+        if incremental:
+            # 增量讀取記住的整月解析結果：分頁數上限與資料快取相同 (每個分頁一份)，位元組使用切出的額度
+            self.incremental = IncrementalSheetLoader(self.source, reconcile_interval, max_states=cache_max_entries,
+                                                      max_bytes=incremental_bytes)
+
+    @classmethod
+    def from_secrets(cls, conn, secrets):
+        """依 secrets.toml 的設定建立引擎 (st.secrets 或 load_secrets() 的結果皆可)。"""
+        cache_cfg = secrets.get("cache", {})
+        incremental_cfg = secrets.get("incremental", {})
+        fanout_cfg = secrets.get("fanout", {})
+        instrument_cfg = secrets.get("instrument", {})
+        refresh_cfg = secrets.get("refresh", {})
+        shared_cfg = secrets.get("shared", {})
+        reconcile = incremental_cfg.get("reconcile_minutes")
+        max_mb = cache_cfg.get("max_mb", DEFAULT_MAX_BYTES / 2 ** 20)
+        return cls(
+            conn,
+            config_url=secrets.get("leaderboard", {}).get("url"),
+            leaderboard_months=secrets.get("leaderboard", {}).get("recent_months"),
+            sheet_names=secrets.get("sheet_names", {}),
+            snapshot_dir=cache_cfg.get("snapshot_dir", SNAPSHOT_DIR),
+            snapshot_max_age=cache_cfg.get("snapshot_max_age", SNAPSHOT_MAX_AGE),
+            ttl=cache_cfg.get("ttl", DEFAULT_TTL),
+            incremental=incremental_cfg.get("enabled", True),
+            reconcile_interval=timedelta(minutes=reconcile) if reconcile else RECONCILE_INTERVAL,
+            fanout_workers=fanout_cfg.get("max_workers", DEFAULT_MAX_WORKERS),
+            fanout_timeout=fanout_cfg.get("timeout", DEFAULT_TIMEOUT),
+            instrument=instrument_cfg.get("enabled", False),
+            kpis=secrets.get("kpis"),
+            refresh_workers=refresh_cfg.get("max_workers", DEFAULT_REFRESH_WORKERS) if refresh_cfg.get("enabled", True) else 0,
+            refresh_interval=refresh_cfg.get("interval", DEFAULT_REFRESH_INTERVAL),
+            refresh_ahead=refresh_cfg.get("ahead", DEFAULT_REFRESH_AHEAD),
+            hot_window=refresh_cfg.get("hot_window", DEFAULT_HOT_WINDOW),
+            max_stale=refresh_cfg.get("max_stale", DEFAULT_MAX_STALE),
+            cache_max_bytes=int(max_mb * 2 ** 20) if max_mb else None,
+            cache_max_entries=cache_cfg.get("max_entries", DEFAULT_MAX_ENTRIES) or None,
+            shared_dir=shared_cfg.get("dir", SHARED_DIR) if shared_cfg.get("enabled", False) else None,
+            incremental_share=cache_cfg.get("incremental_share", BUDGET_SHARE),
+        )
+
+    def _take_forced(self, key):
+        with self._forced_lock:
+            if key in self._forced:
+                self._forced.discard(key)
+                return True
+            return False
+
+    def _shared(self, key, loader, tags=()):
+        # 啟用共用資料檔時經由 SharedFrameStore (多個行程只讀一次)；否則直接讀取
+        if self.shared is None:
+            return loader()
+        return self.shared.load(key, loader, tags)
+
+    # --- 中央系統配置表 (v7.2 核心邏輯：填補 + 斷尾 + 原序 + 來客數修復) ---
+    def _fetch_system_config(self, force=False):
+        # 兩個分頁在同一份試算表：需要重新下載時一次請求讀回。
+        # 可依範圍讀取時排名結果改為只下載切刀左側 (及最近 N 個月)，不放進批次
+        projected = self.source.supports_values()
+        batch = BatchRead(self.source, self.config_url, _CONFIG_SHEETS[:1] if projected else _CONFIG_SHEETS, header=0)
+
+        def batch_read(worksheet):
+            def read():
+                df_raw = batch.take(worksheet)
+                return self.source.read(self.config_url, worksheet, header=0) if df_raw is None else df_raw
+            return read
+
+        def read_ranked():
+            # 版面不適用範圍讀取時 read_leaderboard 回傳 None，改為整頁讀取；API / 權限錯誤照常拋出
+            df_raw = None
+            if projected:
+                df_raw = read_leaderboard(self.source, self.config_url, _CONFIG_SHEETS[1], self.leaderboard_months)
+            return batch_read(_CONFIG_SHEETS[1])() if df_raw is None else df_raw
+
+        def load(worksheet, parse, read, variant=""):
+            return self._shared(
+                _CONFIG_KEY + (worksheet, variant),
+                lambda: self.snapshots.load(self.config_url, worksheet, parse, read=read, variant=variant, force=force),
+                tags=(LEADERBOARD_TAG,),
+            )
+
+        # 1. 讀取系統配置 (選單來源)，強力清洗文字欄位
+        df_config = load(_CONFIG_SHEETS[0], clean_system_config, batch_read(_CONFIG_SHEETS[0]))
+
+        # 2. 讀取排名結果 (資料來源)，清洗 (切刀 + 填補 + 來客數修復 + 排除門市彙總列) 後轉為精簡型態
+        months = self.leaderboard_months
+        df_clean = load(_CONFIG_SHEETS[1], parse_leaderboard, read_ranked, variant=f"recent{months}" if months else "")
+
+        # 3. 排名索引 (每次載入排行榜建立一次，切換指標/月份/分店只需查表)
+        with self.instrument.stage("rank_index", rows=len(df_clean)):
+            lb_index = RankIndex(df_clean)
+        return df_config, df_clean, lb_index
+
+    def load_system_config(self):
+        """回傳 (系統配置, 排名結果, 排名索引)；未設定排行榜網址時皆為空。"""
+        if not self.config_url:
+            return pd.DataFrame(), pd.DataFrame(), RankIndex(pd.DataFrame())
+        return self.cache.get(_CONFIG_KEY, lambda: self._fetch_system_config(self._take_forced(_CONFIG_KEY)),
+                              tags=(LEADERBOARD_TAG,))
+
+    # --- 分店 / 人員每日資料 ---
+    def _fetch_data(self, url, worksheet, branch, batch=None, force=False, tails=None):
+        clean_url = clean_google_sheet_url(url)
+        try_list = candidate_names(worksheet, branch, self.sheet_names.get(branch))
+        is_store_total = worksheet == branch or worksheet in STORE_TOTAL_NAMES
+
+        # prefetch_branch 已批次讀回的分頁 (每個分頁只取用一次)；沒有時為 None
+        def take_prefetched(sheet_name):
+            return batch.take(sheet_name) if batch is not None and sheet_name else None
+
+        # 分頁名稱在本機依分頁清單解析 (結果會記錄下來)，每次只實際讀取一次
+        def read_resolved():
+            if batch is not None:
+                df_raw = take_prefetched(self.worksheet_index.resolve(clean_url, try_list, allow_default=is_store_total))
+                if df_raw is not None:
+                    return df_raw
+            return self.worksheet_index.read(clean_url, try_list, allow_default=is_store_total)
+
+        if self.incremental is None:
+            return self.snapshots.load(clean_url, worksheet, parse_branch_data, read=read_resolved, variant=branch,
+                                       force=force)
+
+        # 增量模式：read 直接回傳解析後資料，快照層只負責轉精簡型態與存檔 (只有整頁讀取的結果才存檔)
+        complete = True
+
+        def read_incremental():
+            nonlocal complete
+            sheet_name = self.worksheet_index.resolve(clean_url, try_list, allow_default=is_store_total)
+            if sheet_name is None:
+                return parse_branch_sheet(read_resolved())
+            try:
+                read_tail = (lambda start: tails.take(sheet_name, start)) if tails is not None else None
+                parsed, complete = self.incremental.load(clean_url, sheet_name or None, parse_branch_sheet,
+                                                         read=lambda: take_prefetched(sheet_name), force=force,
+                                                         read_tail=read_tail)
+                return parsed
+            except Exception:
+                # 分頁可能被改名：重新探索並整頁讀取
+                self.worksheet_index.forget(clean_url, try_list)
+                return parse_branch_sheet(read_resolved())
+
+        return self.snapshots.load(clean_url, worksheet, compact_branch_frame, read=read_incremental, variant=branch,
+                                   persist=lambda: complete, force=force)
+
+    def _load_sheet(self, url, worksheet, branch, batch=None, tails=None):
+        key, tags = _sheet_key(url, worksheet, branch), (branch_tag(branch), sheet_tag(branch, worksheet))
+
+        def load():
+            force = self._take_forced(key)
+            return self._shared(key, lambda: self._fetch_data(url, worksheet, branch, batch, force, tails), tags)
+
+        return self.cache.get(key, load, tags)
+
+    def load_data(self, url, worksheet, branch):
+        return self._load_sheet(url, worksheet, branch)
+
+    def prefetch_branch(self, url, branch, worksheets):
+        """把同一分店試算表中尚未快取 (或已過期) 的分頁 (門市總表 + 各人員) 以一次請求讀回並放入快取。
+
+        增量模式下只需抓尾段的分頁，改為一次請求讀回所有尾段。
+        無法解析名稱的分頁略過 (之後由 load_data 照常讀取)；回傳批次讀取的分頁數。
+        """
+        clean_url = clean_google_sheet_url(url)
+        missing = []
+        for worksheet in dict.fromkeys(worksheets):
+            age = self.cache.age(_sheet_key(url, worksheet, branch))
+            if age is None or age >= self.cache.ttl:
+                missing.append(worksheet)
+        if len(missing) < 2:
+            return 0
+
+        sheet_names = {}
+        for worksheet in missing:
+            is_store_total = worksheet == branch or worksheet in STORE_TOTAL_NAMES
+            try_list = candidate_names(worksheet, branch, self.sheet_names.get(branch))
+            try:
+                sheet_name = self.worksheet_index.resolve(clean_url, try_list, allow_default=is_store_total)
+            except Exception:
+                sheet_name = None
+            if sheet_name:
+                sheet_names[worksheet] = sheet_name
+        if len(sheet_names) < 2:
+            return 0
+
+        # 增量模式下只需抓尾段的分頁另外以一次請求讀回尾段，其餘整頁批次讀取
+        ranges = {}
+        if self.incremental is not None:
+            for sheet_name in sheet_names.values():
+                tail = self.incremental.tail_range(clean_url, sheet_name)
+                if tail is not None:
+                    ranges[sheet_name] = tail
+        batch = BatchRead(self.source, clean_url, [n for n in sheet_names.values() if n not in ranges], header=None)
+        tails = BatchTailRead(self.source, clean_url, ranges) if ranges else None
+        for worksheet in sheet_names:
+            try:
+                self._load_sheet(url, worksheet, branch, batch, tails)
+            except Exception:
+                pass
+        return len(sheet_names)
+
+    # --- 全公司即時彙總：平行讀取各分店試算表後於本機合併 ---
+    def load_all_branches(self, month_config):
+        """回傳 (合併後每日資料, FanOutResult)。month_config 為系統配置表中選定月份的列。"""
+        branch_urls = {}
+        for branch, raw_url in zip(month_config['分店代號'], month_config['試算表網址']):
+            if branch != "ALL" and branch not in branch_urls:
+                branch_urls[branch] = clean_google_sheet_url(raw_url)
+
+        with self.instrument.stage("fanout", branches=len(branch_urls)):
+            fan_out = load_branches(
+                branch_urls,
+                lambda branch, url: self.load_data(url, branch, branch),
+                max_workers=self.fanout_workers,
+                timeout=self.fanout_timeout,
+            )
+        with self.instrument.stage("fanout.merge") as stage:
+            merged = merge_branch_frames(fan_out.frames.values(), self.kpis)
+            stage.frame(merged)
+        return merged, fan_out
+
+    # --- 快照時間 (秒；尚未載入為 None) 與是否正在背景更新 ---
+    def config_age(self):
+        return self.cache.age(_CONFIG_KEY)
+
+    def data_age(self, url, worksheet, branch):
+        return self.cache.age(_sheet_key(url, worksheet, branch))
+
+    def data_refreshing(self, url, worksheet, branch):
+        return self.cache.refreshing(_sheet_key(url, worksheet, branch))
+
+    # --- 記憶體用量 (容器規劃用) ---
+    def memory_usage(self):
+        """資料快取的用量 (見 LoaderCache.usage)，另含增量讀取記住的分頁 (incremental) 與共用資料檔 (shared，啟用時)。"""
+        usage = self.cache.usage()
+        usage["incremental"] = (self.incremental.memory_usage() if self.incremental is not None
+                                else {"states": 0, "bytes": 0, "max_bytes": 0})
+        if self.shared is not None:
+            usage["shared"] = self.shared.usage()
+        return usage
+
+    # --- 快取局部清除 ---
+    # 手動清除代表資料可能有快照標記看不出的變動 (回頭修改、IMPORTRANGE)：
+    # 被清除的鍵下次讀取時整頁重新下載，不沿用磁碟快照與增量狀態
+    def invalidate(self, tag):
+        keys = self.cache.keys(tag)
+        with self._forced_lock:
+            self._forced.update(keys)
+        # 分頁清單也重新列出 (例如剛新增的人員分頁)
+        for url in {k[1] for k in keys if k[0] == "sheet"}:
+            self.worksheet_index.forget_titles(clean_google_sheet_url(url))
+        if self.shared is not None:
+            self.shared.invalidate(tag)
+        return self.cache.invalidate(tag)
+
+    def clear(self):
+        with self._forced_lock:
+            self._forced.update(self.cache.keys())
+        self.worksheet_index.forget_titles()
+        if self.incremental is not None:
+            self.incremental.forget()
+        if self.shared is not None:
+            self.shared.clear()
+        return self.cache.clear()
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:                 # Windows：不支援跨行程共用
+    fcntl = None
+
+from engine.cache import DEFAULT_TTL
+from engine.instrument import Instrumentation
+
+SHARED_DIR = os.path.join(".cache", "shared")
+_META_KEY = b"engine.meta"          # 寫入時間 / 標籤，存在 Arrow schema metadata
+_ATTRS_KEY = b"engine.attrs"        # DataFrame.attrs (例如解析報告)
+_REFRESHER_LOCK = "refresher.lock"
+
+
+class SharedFrameStore:
+    """同一台主機上多個 App 行程共用的資料檔：每個快取鍵一個 Arrow IPC 檔，讀取端以 memory map 開啟。
+
+    - 檔案未超過 ttl 就直接讀檔，不連線；數值欄位直接引用共用的檔案分頁，各行程不另外複製
+    - 需要重新讀取時以 flock 取得該鍵的寫入鎖，只有拿到鎖的行程連線讀取；
+      其他行程有舊檔就先回傳舊檔，沒有時等待寫入完成
+    - 寫入先寫暫存檔再 os.replace，讀取端永遠看到完整的檔案 (已開啟的舊檔不受影響)
+    - is_refresher() 讓同一時間只有一個行程負責主動更新，該行程結束後由其他行程接手
+    只支援 POSIX (fcntl)。無法轉成 Arrow 的值 (混型欄位、非 DataFrame) 不共用，照常回傳。
+    """
+
+    def __init__(self, root=SHARED_DIR, ttl=DEFAULT_TTL, instrument=None):
+        if fcntl is None:
+            raise RuntimeError("共用資料檔需要 fcntl (Linux / macOS)")
+        import pyarrow  # noqa: F401  (缺少時在啟動時就報錯)
+
+        self.root = root
+        self.ttl = ttl
+        self.instrument = instrument or Instrumentation()
+        self._leader_fd = None
+        self._leader_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, hashlib.sha1(repr(key).encode()).hexdigest() + ".arrow")
+
+    @staticmethod
+    def _meta(schema):
+        metadata = schema.metadata or {}
+        return json.loads(metadata[_META_KEY]) if _META_KEY in metadata else None
+
+    def _read(self, path, worksheet=None):
+        """回傳 (DataFrame, meta)；檔案不存在或不完整時為 (None, None)。"""
+        import pyarrow as pa
+
+        try:
+            # 不關閉 memory map：回傳的欄位直接引用映射的記憶體，沒有引用時才會解除映射
+            reader = pa.ipc.open_file(pa.memory_map(path))
+        except (OSError, pa.ArrowInvalid):
+            return None, None
+        with self.instrument.stage("shared.read", worksheet=worksheet) as stage:
+            table = reader.read_all()
+            metadata = table.schema.metadata or {}
+            df = table.to_pandas(split_blocks=True)
+            if _ATTRS_KEY in metadata:
+                df.attrs.update(json.loads(metadata[_ATTRS_KEY]))
+            stage.frame(df)
+        return df, self._meta(table.schema)
+
+    def _write(self, path, key, value, tags):
+        """寫入後改由檔案映射回傳 (與其他行程共用同一份)；無法轉成 Arrow 時回傳 None。"""
+        import pyarrow as pa
+
+        if not isinstance(value, pd.DataFrame):
+            return None
+        try:
+            table = pa.Table.from_pandas(value, preserve_index=True)
+            attrs = json.dumps(value.attrs, ensure_ascii=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            return None
+        meta = {"key": repr(key), "written_at": time.time(), "tags": sorted(tags)}
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            _META_KEY: json.dumps(meta, ensure_ascii=False).encode(),
+            _ATTRS_KEY: attrs.encode(),
+        })
+
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return None
+        df, _ = self._read(path)
+        return df
+
+    def _fresh(self, meta):
+        return meta is not None and time.time() - meta["written_at"] < self.ttl
+
+    def load(self, key, loader, tags=()):
+        """取得鍵對應的 DataFrame：共用檔仍新鮮就直接映射，否則由單一行程呼叫 loader() 重讀並寫入。"""
+        name = f"shared.{key[0]}"
+        path = self._path(key)
+        df, meta = self._read(path)
+        if df is not None and self._fresh(meta):
+            self.instrument.count(name, "hit")
+            return df
+
+        fd = os.open(path + ".lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if df is not None:
+                    # 其他行程正在更新，先回傳舊檔
+                    self.instrument.count(name, "stale")
+                    return df
+                fcntl.flock(fd, fcntl.LOCK_EX)
+
+            # 拿到鎖後再確認一次：可能剛由其他行程寫好
+            df, meta = self._read(path)
+            if df is not None and self._fresh(meta):
+                self.instrument.count(name, "shared")
+                return df
+
+            self.instrument.count(name, "miss")
+            value = loader()
+            shared = self._write(path, key, value, tags)
+            return value if shared is None else shared
+        finally:
+            os.close(fd)
+
+    # --- 主動更新的負責行程 ---
+    def is_refresher(self):
+        """本行程是否 (或能否成為) 負責主動更新的行程；持有者結束時鎖自動釋放，下一次呼叫的行程接手。"""
+        with self._leader_lock:
+            if self._leader_fd is None:
+                fd = os.open(os.path.join(self.root, _REFRESHER_LOCK), os.O_CREAT | os.O_RDWR, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    return False
+                self._leader_fd = fd
+            return True
+
+    # --- 用量 / 失效 ---
+    def _files(self):
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return [os.path.join(self.root, n) for n in names if n.endswith(".arrow")]
+
+    def usage(self):
+        """共用檔數量與總大小 (位元組)。"""
+        files, nbytes = 0, 0
+        for path in self._files():
+            try:
+                nbytes += os.path.getsize(path)
+                files += 1
+            except OSError:
+                pass
+        return {"files": files, "bytes": nbytes}
+
+    def invalidate(self, tag):
+        """刪除帶有指定標籤的共用檔 (所有行程下次讀取時重讀)，回傳刪除數量。"""
+        import pyarrow as pa
+
+        removed = 0
+        for path in self._files():
+            try:
+                meta = self._meta(pa.ipc.open_file(pa.memory_map(path)).schema)
+                if meta and tag in meta["tags"]:
+                    os.remove(path)
+                    removed += 1
+            except (OSError, pa.ArrowInvalid):
+                pass
+        return removed
+
+    def clear(self):
+        removed = 0
+        for path in self._files():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
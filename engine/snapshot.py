@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from engine.sources import spreadsheet_id
+
+SNAPSHOT_DIR = os.path.join(".cache", "snapshots")
+SNAPSHOT_MAX_AGE = 1800     # 快照最久沿用多久 (秒)；之後即使修改時間沒變也重新下載比對內容
+
+
+def content_hash(df):
+    """沒有版本標記時的後備方案：以內容雜湊判斷資料是否變動。"""
+    h = hashlib.sha1()
+    h.update("\x1f".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return "sha1:" + h.hexdigest()
+
+
+class SnapshotCache:
+    """以 (試算表, 分頁) 為鍵的磁碟快照；版本標記沒變就直接讀快照，不重新下載/解析。
+
+    版本標記 (修改時間) 看不到 IMPORTRANGE / 公式重算，因此快照最多沿用 max_age 秒 (None 為不限)。
+    快照存成 Parquet (混型欄位無法轉 Arrow 時改存 pickle)，重新部署後仍可沿用。
+    """
+
+    def __init__(self, source, root=SNAPSHOT_DIR, version="", max_age=SNAPSHOT_MAX_AGE):
+        self.source = source
+        self.max_age = max_age
+        self.root = root
+        self.version = version
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _base(self, spreadsheet, worksheet, variant):
+        name = f"{spreadsheet_id(spreadsheet)}|{worksheet}|{variant}|{self.version}"
+        return os.path.join(self.root, hashlib.sha1(name.encode()).hexdigest())
+
+    def _read_meta(self, base):
+        try:
+            with open(base + ".json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_frame(self, base, meta):
+        try:
+            if meta["format"] == "parquet":
+                return pd.read_parquet(base + ".parquet")
+            return pd.read_pickle(base + ".pkl")
+        except Exception:
+            return None
+
+    def _write(self, base, df, meta):
+        tmp = f"{base}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp)
+            meta["format"], path = "parquet", base + ".parquet"
+        except Exception:
+            df.to_pickle(tmp)
+            meta["format"], path = "pickle", base + ".pkl"
+        os.replace(tmp, path)
+        self._write_meta(base, meta)
+
+    def _write_meta(self, base, meta):
+        tmp = f"{base}.{os.getpid()}.{threading.get_ident()}.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, base + ".json")
+
+    def _snapshot(self, base, meta, worksheet):
+        with self.source.instrument.stage("snapshot.read", worksheet=worksheet) as stage:
+            df = self._read_frame(base, meta)
+            if df is not None:
+                stage.frame(df)
+        return df
+
+    def load(self, spreadsheet, worksheet, parse, header=None, read=None, variant="", persist=None, force=False):
+        """取得解析後的分頁資料。read 可自訂下載方式 (例如多個候選分頁名稱)；variant 區分同一分頁的不同讀法。
+
+        persist() 回傳 False 時 (例如增量讀取只抓了尾段) 結果不存檔，下次仍以上一份完整快照的標記比對。
+        force=True 時不比對標記，一律重新下載並覆寫快照 (IMPORTRANGE 等更新不會改變修改時間)。
+        快照超過 max_age 秒時即使標記相同也重新下載，以內容雜湊判斷是否真的變動 (公式重算同樣不改修改時間)。
+        """
+        base = self._base(spreadsheet, worksheet, variant)
+        meta = self._read_meta(base)
+
+        marker = self.source.revision(spreadsheet)
+        fresh = meta is not None and (self.max_age is None or time.time() - meta.get("written_at", 0) < self.max_age)
+        if not force and fresh and marker is not None and meta.get("marker") == marker:
+            df = self._snapshot(base, meta, worksheet)
+            if df is not None:
+                return df
+
+        if read is None:
+            df_raw = self.source.read(spreadsheet, worksheet, header=header)
+        else:
+            df_raw = read()
+
+        content = content_hash(df_raw)
+        if marker is None:
+            marker = content
+        if not force and meta and meta.get("content", meta.get("marker")) == content:
+            df = self._snapshot(base, meta, worksheet)
+            if df is not None:
+                # 內容沒變：只更新標記與時間，下次在 max_age 內不必再下載
+                with self._lock:
+                    self._write_meta(base, {**meta, "marker": marker, "written_at": time.time()})
+                return df
+
+        with self.source.instrument.stage("parse", worksheet=worksheet) as stage:
+            df = parse(df_raw)
+            stage.frame(df)
+        if persist is not None and not persist():
+            return df
+        with self._lock:
+            self._write(base, df, {"spreadsheet": spreadsheet, "worksheet": worksheet, "variant": variant,
+                                   "marker": marker, "content": content, "written_at": time.time()})
+        return df
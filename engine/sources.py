@@ -0,0 +1,279 @@
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from engine.instrument import Instrumentation
+
+# 試算表網址中的檔案 ID (.../spreadsheets/d/<id>/edit)
+_SPREADSHEET_ID = re.compile(r"/d/([^/]+)")
+_UNNAMED_COLUMN = re.compile(r"^Unnamed:\s\d+")
+REVISION_TTL = 10       # 同一試算表的版本標記在幾秒內重複使用 (一次預讀/載入中的多個分頁只查一次)
+_VALUE_PARAMS = {"valueRenderOption": "UNFORMATTED_VALUE", "dateTimeRenderOption": "FORMATTED_STRING"}
+
+
+def clean_google_sheet_url(url):
+    if not isinstance(url, str): return url
+    url = url.strip()
+    if "#" in url: url = url.split("#")[0]
+    if "/edit" in url: url = url.split("/edit")[0] + "/edit"
+    return url
+
+
+def spreadsheet_id(spreadsheet):
+    found = _SPREADSHEET_ID.search(str(spreadsheet))
+    return found.group(1) if found else str(spreadsheet)
+
+
+def _quote_title(worksheet):
+    return "'" + worksheet.replace("'", "''") + "'"
+
+
+def _column_letter(n):
+    # 1-based 欄號 → A1 欄名 (1 → A, 27 → AA)
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def a1_range(worksheet, start=0, stop=None, start_col=0, stop_col=None):
+    """0-based、不含結尾的列/欄範圍 → A1 表示法；不限欄時必須指定 stop (整列範圍)。worksheet 為 None 時指第一個分頁。"""
+    prefix = "" if worksheet is None else _quote_title(worksheet) + "!"
+    if stop_col is None:
+        if stop is None:
+            raise ValueError("不限欄數時需指定結束列")
+        return f"{prefix}{start + 1}:{stop}"
+    return f"{prefix}{_column_letter(start_col + 1)}{start + 1}:{_column_letter(stop_col)}{stop or ''}"
+
+
+def values_frame(values, header=None, drop_empty=True):
+    """API 回傳的儲存格值 → DataFrame，處理方式與 GSheetsConnection.read (gspread_dataframe) 相同：
+    補齊成矩形、空字串視為空值、移除整列空白與無表頭的全空欄位。
+    drop_empty=False 時保留空白列/欄 (列號需對應分頁位置時使用)。"""
+    width = max(map(len, values), default=0)
+    if not width:
+        return pd.DataFrame()
+    rows = [list(row) + [''] * (width - len(row)) for row in values]
+    df = TextParser(rows, header=header).read()
+    if not drop_empty:
+        return df
+    df = df.dropna(how='all', axis=0)
+    unnamed = [
+        c for c in df.columns
+        if (isinstance(c, (int, np.integer)) or (isinstance(c, str) and _UNNAMED_COLUMN.search(c))) and df[c].isna().all()
+    ]
+    return df.drop(columns=unnamed) if unnamed else df
+
+
+class SheetSource:
+    """包裝 GSheetsConnection (或同介面的替身)，提供讀取與「是否有變動」的廉價檢查。"""
+
+    def __init__(self, conn, instrument=None, revision_ttl=REVISION_TTL):
+        self.conn = conn
+        self.instrument = instrument or Instrumentation()
+        self.revision_ttl = revision_ttl
+        self._lock = threading.Lock()
+        self._spreadsheets = {}
+        self._revisions = {}
+
+    def read(self, spreadsheet, worksheet=None, **options):
+        # 新鮮度由上層快取判斷，這裡一律繞過連線自帶的 1 小時快取
+        options.setdefault("ttl", 0)
+        with self.instrument.stage("sheets.read", worksheet=worksheet) as stage:
+            if worksheet is None:
+                df = self.conn.read(spreadsheet=spreadsheet, **options)
+            else:
+                df = self.conn.read(spreadsheet=spreadsheet, worksheet=worksheet, **options)
+            stage.frame(df)
+        return df
+
+    def _gspread_client(self):
+        # 只有服務帳戶連線才有 gspread client；公開試算表 (CSV 匯出) 為 None
+        return getattr(getattr(self.conn, "client", None), "_client", None)
+
+    def _spreadsheet(self, spreadsheet):
+        # open_by_url 每次都要多一次 metadata 請求，同一份試算表只開一次
+        key = spreadsheet_id(spreadsheet)
+        with self._lock:
+            sheet = self._spreadsheets.get(key)
+        if sheet is None:
+            sheet = self._gspread_client().open_by_url(spreadsheet)
+            with self._lock:
+                self._spreadsheets[key] = sheet
+        return sheet
+
+    def read_many(self, spreadsheet, worksheets, header=None):
+        """同一試算表的多個分頁一次請求讀回 (values_batch_get)，回傳 {分頁: DataFrame}，格式同 read()。
+
+        連線不支援批次讀取時逐頁讀取；任一分頁不存在時整批失敗 (由呼叫端改為逐頁讀取)。
+        """
+        worksheets = list(dict.fromkeys(worksheets))
+        if not worksheets:
+            return {}
+        with self.instrument.stage("sheets.read_many", worksheets=len(worksheets)) as stage:
+            if hasattr(self.conn, "read_many"):
+                frames = self.conn.read_many(spreadsheet, worksheets, header=header)
+            elif self._gspread_client() is not None:
+                response = self._spreadsheet(spreadsheet).values_batch_get(
+                    [_quote_title(ws) for ws in worksheets], params=_VALUE_PARAMS
+                )
+                value_ranges = response.get("valueRanges", [])
+                frames = {ws: values_frame(vr.get("values", []), header) for ws, vr in zip(worksheets, value_ranges)}
+            else:
+                frames = {ws: self.conn.read(spreadsheet=spreadsheet, worksheet=ws, ttl=0, header=header) for ws in worksheets}
+            stage.note(rows=sum(len(df) for df in frames.values()))
+        return frames
+
+    def worksheet_titles(self, spreadsheet):
+        """列出試算表的所有分頁名稱；連線不支援時回傳 None。"""
+        if hasattr(self.conn, "worksheet_titles"):
+            with self.instrument.stage("sheets.titles"):
+                return self.conn.worksheet_titles(spreadsheet)
+        gspread_client = self._gspread_client()
+        if gspread_client is None:
+            return None
+        with self.instrument.stage("sheets.titles"):
+            return [ws.title for ws in self._spreadsheet(spreadsheet).worksheets()]
+
+    def supports_ranges(self):
+        return hasattr(self.conn, "read_rows") or self._gspread_client() is not None
+
+    def read_rows(self, spreadsheet, worksheet, start, stop=None, stop_col=None):
+        """只讀取第 start 列 (含) 到 stop 列 (不含)、前 stop_col 欄的儲存格，格式同 read(header=None)；列號 0-based。
+
+        空白列保留 (列號與分頁位置對應)；stop 與 stop_col 都未指定時多查一次分頁大小。
+        """
+        with self.instrument.stage("sheets.read_rows", worksheet=worksheet, start=start) as stage:
+            df = self._read_rows(spreadsheet, worksheet, start, stop, stop_col)
+            stage.frame(df)
+        return df
+
+    def _read_rows(self, spreadsheet, worksheet, start, stop, stop_col):
+        if hasattr(self.conn, "read_rows"):
+            return self.conn.read_rows(spreadsheet, worksheet, start, stop, stop_col)
+        if stop is not None and start >= stop:
+            return pd.DataFrame()
+        if stop is None and stop_col is None:
+            sheet = self._spreadsheet(spreadsheet)
+            stop_col = (sheet.worksheet(worksheet) if worksheet else sheet.get_worksheet(0)).col_count
+        response = self._spreadsheet(spreadsheet).values_get(a1_range(worksheet, start, stop, 0, stop_col),
+                                                             params=_VALUE_PARAMS)
+        return values_frame(response.get("values", []), drop_empty=False)
+
+    def read_rows_many(self, spreadsheet, ranges):
+        """同一試算表多個分頁的尾段一次請求讀回：ranges 為 {分頁: (起始列, 欄數)}，回傳 {分頁: DataFrame}，格式同 read_rows()。"""
+        if not ranges:
+            return {}
+        with self.instrument.stage("sheets.read_rows_many", worksheets=len(ranges)) as stage:
+            if hasattr(self.conn, "read_rows_many"):
+                frames = self.conn.read_rows_many(spreadsheet, ranges)
+            elif self._gspread_client() is not None:
+                response = self._spreadsheet(spreadsheet).values_batch_get(
+                    [a1_range(ws, start, None, 0, width) for ws, (start, width) in ranges.items()], params=_VALUE_PARAMS
+                )
+                value_ranges = response.get("valueRanges", [])
+                frames = {ws: values_frame(vr.get("values", []), drop_empty=False) for ws, vr in zip(ranges, value_ranges)}
+            else:
+                frames = {ws: self.conn.read_rows(spreadsheet, ws, start, None, width) for ws, (start, width) in ranges.items()}
+            stage.note(rows=sum(len(df) for df in frames.values()))
+        return frames
+
+    def supports_values(self):
+        return hasattr(self.conn, "read_values") or self._gspread_client() is not None
+
+    def read_values(self, spreadsheet, worksheet, start=0, stop=None, start_col=0, stop_col=None):
+        """只讀取指定範圍的原始儲存格值 (list of rows，空白為 '')，列/欄號 0-based、不含結尾。
+
+        與 read() 相同以 UNFORMATTED_VALUE 取值；尾端的空白列/儲存格 API 不會回傳，由呼叫端自行補齊。
+        """
+        with self.instrument.stage("sheets.read_values", worksheet=worksheet, start=start, stop_col=stop_col) as stage:
+            if hasattr(self.conn, "read_values"):
+                values = self.conn.read_values(spreadsheet, worksheet, start, stop, start_col, stop_col)
+            else:
+                response = self._spreadsheet(spreadsheet).values_get(
+                    a1_range(worksheet, start, stop, start_col, stop_col), params=_VALUE_PARAMS
+                )
+                values = response.get("values", [])
+            stage.note(rows=len(values), cells=sum(map(len, values)))
+        return values
+
+    def revision(self, spreadsheet):
+        """回傳試算表的版本標記 (最後修改時間)；無法取得時回傳 None，由呼叫端改用內容雜湊。
+
+        revision_ttl 秒內重複查詢同一試算表時沿用上次的結果。
+        """
+        key = spreadsheet_id(spreadsheet)
+        with self._lock:
+            cached = self._revisions.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.revision_ttl:
+            return cached[1]
+        marker = self._revision(spreadsheet)
+        with self._lock:
+            self._revisions[key] = (time.monotonic(), marker)
+        return marker
+
+    def _revision(self, spreadsheet):
+        if hasattr(self.conn, "revision"):
+            with self.instrument.stage("sheets.revision"):
+                return self.conn.revision(spreadsheet)
+        gspread_client = self._gspread_client()
+        if gspread_client is None:
+            return None
+        try:
+            with self.instrument.stage("sheets.revision"):
+                return self._spreadsheet(spreadsheet).get_lastUpdateTime()
+        except Exception:
+            return None
+
+
+class BatchRead:
+    """延遲的批次讀取：第一次取用任一分頁時才把所有分頁一次讀回。
+
+    每個分頁的結果只交出一次 (之後的背景更新改回單獨讀取，不會拿到舊資料)；
+    批次讀取失敗或分頁不在結果中時 take() 回傳 None，由呼叫端自行讀取。
+    """
+
+    def __init__(self, source, spreadsheet, worksheets, header=None):
+        self.source = source
+        self.spreadsheet = spreadsheet
+        self.worksheets = list(worksheets)
+        self.header = header
+        self._lock = threading.Lock()
+        self._frames = None
+
+    def _read(self):
+        return self.source.read_many(self.spreadsheet, self.worksheets, header=self.header)
+
+    def take(self, worksheet):
+        with self._lock:
+            if self._frames is None:
+                try:
+                    self._frames = self._read()
+                except Exception:
+                    self._frames = {}
+            return self._frames.pop(worksheet, None)
+
+
+class BatchTailRead(BatchRead):
+    """延遲的批次尾段讀取 (增量模式)：ranges 為 {分頁: (起始列, 欄數)}，第一次取用時以一次請求讀回所有尾段。
+
+    take(worksheet, start) 只在起始列與預讀時相同時交出結果，否則回傳 None。
+    """
+
+    def __init__(self, source, spreadsheet, ranges):
+        super().__init__(source, spreadsheet, ranges)
+        self.ranges = dict(ranges)
+
+    def _read(self):
+        return self.source.read_rows_many(self.spreadsheet, self.ranges)
+
+    def take(self, worksheet, start=None):
+        planned = self.ranges.get(worksheet)
+        if planned is None or (start is not None and planned[0] != start):
+            return None
+        return super().take(worksheet)
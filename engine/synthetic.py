@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from engine.sources import spreadsheet_id
+
+# 與實際分頁相同的指標欄位
+METRICS = [
+    '毛利', '配件營收', '保險營收', '門號', '來客數', 'GOOGLE 評論', '生活圈', '庫存手機', 'VIVO手機', '蘋果手機',
+    '蘋果平板+手錶', '華為穿戴', 'GPLUS GP-S10吸塵器', 'VIVO銷售目標', '橙艾玻璃貼(13,14,15系列)',
+    '遠傳續約累積GAP', '遠傳升續率', '遠傳平續率', '綜合指標',
+]
+LEADERBOARD_METRICS = METRICS[:10]
+CONFIG_URL = "https://docs.google.com/spreadsheets/d/synthetic-config/edit"
+
+
+def _url(key):
+    return f"https://docs.google.com/spreadsheets/d/{key}/edit"
+
+
+class SyntheticSheetsConnection:
+    """在記憶體中產生實際版面的假 Google Sheets，並模擬網路延遲與失敗 (效能測試用)。
+
+    - 中央試算表 (CONFIG_URL)：「系統配置」與「排名結果」
+    - 每月每店一份試算表：全店總表 + 每位人員一個分頁 (第 2 列年/月、第 3 列表頭、第 15 列起每日資料)
+    - 每月一份 ALL 試算表
+    分頁在第一次讀取時才產生。latency / jitter 為每次呼叫的秒數，failure_rate 為隨機失敗機率。
+    """
+
+    def __init__(self, n_stores=10, staff_per_store=5, n_months=12, latency=0.0, jitter=0.0,
+                 failure_rate=0.0, seed=0, today=None):
+        self.today = today or datetime.now()
+        self.stores = [f"門市{i:03d}店" for i in range(n_stores)]
+        self.staff = {s: [f"{s[:-1]}-員{j}" for j in range(staff_per_store)] for s in self.stores}
+        last = pd.Period(self.today, freq="M")
+        self.months = [last - i for i in range(n_months)][::-1]
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._grids = {}
+        self._revisions = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "cells": 0, "failures": 0}
+
+    # --- 試算表配置 ---
+    def branch_url(self, month, store):
+        return _url(f"synthetic-{month}-{self.stores.index(store)}")
+
+    def all_url(self, month):
+        return _url(f"synthetic-{month}-all")
+
+    def _rng(self, *parts):
+        return np.random.default_rng(zlib.crc32("|".join(map(str, (self.seed,) + parts)).encode()))
+
+    def _config_grid(self):
+        rows = [["月份", "分店代號", "試算表網址"]]
+        for month in self.months:
+            label = month.start_time.strftime("%Y/%m/%d")
+            rows.append([label, "ALL", self.all_url(month)])
+            rows.extend([label, store, self.branch_url(month, store)] for store in self.stores)
+        return rows
+
+    def _leaderboard_grid(self):
+        rng = self._rng("leaderboard")
+        header = ["月份", "分店", "人員"] + LEADERBOARD_METRICS + ["更新時間", "--->勿動"] + [f"後台{i}" for i in range(12)]
+        rows = [header]
+        for month in self.months:
+            month_label = month.start_time.strftime("%Y/%m/%d")
+            for store in self.stores:
+                # 合併儲存格：月份/分店只寫在區塊第一列；最後一列為門市彙總
+                people = self.staff[store] + [store[:-1]]
+                values = rng.integers(0, 50_000, size=(len(people), len(LEADERBOARD_METRICS)))
+                for k, person in enumerate(people):
+                    rows.append([
+                        month_label if store == self.stores[0] and k == 0 else None,
+                        store if k == 0 else None,
+                        person,
+                        *values[k].tolist(),
+                        "2026-01-01 09:00", None, *rng.random(12).round(3).tolist(),
+                    ])
+        return rows
+
+    def _daily_grid(self, month, name):
+        rng = self._rng(month, name)
+        width = len(METRICS) + 1
+        rows = [[None] * width for _ in range(14)]
+        rows[0][0] = f"{name} 每日業績"
+        rows[1][0], rows[1][1] = month.year, month.month
+        rows[2] = ["日"] + METRICS
+        for r in range(3, 14):
+            rows[r] = [None] + rng.integers(0, 1000, len(METRICS)).tolist()
+        days_done = month.days_in_month
+        if month == pd.Period(self.today, freq="M"):
+            days_done = self.today.day
+        for day in range(1, month.days_in_month + 1):
+            values = rng.integers(0, 3_000, len(METRICS)).tolist() if day <= days_done else [None] * len(METRICS)
+            rows.append([day] + values)
+        return rows
+
+    def _grid(self, key, worksheet):
+        cache_key = (key, worksheet)
+        with self._lock:
+            grid = self._grids.get(cache_key)
+        if grid is not None:
+            return grid
+
+        if key == "synthetic-config":
+            builders = {"系統配置": self._config_grid, "排名結果": self._leaderboard_grid}
+            if worksheet not in builders:
+                raise ValueError(f"WorksheetNotFound: {worksheet}")
+            grid = builders[worksheet]()
+        else:
+            titles = self._titles(key)
+            if worksheet not in titles:
+                raise ValueError(f"WorksheetNotFound: {worksheet}")
+            month = pd.Period(key.split("-")[1] + "-" + key.split("-")[2], freq="M")
+            grid = self._daily_grid(month, worksheet)
+
+        with self._lock:
+            self._grids[cache_key] = grid
+        return grid
+
+    def _titles(self, key):
+        if key == "synthetic-config":
+            return ["系統配置", "排名結果"]
+        suffix = key.rsplit("-", 1)[1]
+        if suffix == "all":
+            return ["ALL"]
+        store = self.stores[int(suffix)]
+        return [store] + self.staff[store]
+
+    # --- 模擬網路 ---
+    def _network(self, cells=0):
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["cells"] += cells
+            failed = self.failure_rate and self._random.random() < self.failure_rate
+            if failed:
+                self.stats["failures"] += 1
+        if failed:
+            raise ConnectionError("模擬的 Google Sheets API 錯誤")
+
+    def touch(self, spreadsheet):
+        """模擬有人編輯了試算表 (版本標記改變)。"""
+        key = spreadsheet_id(spreadsheet)
+        self._revisions[key] = self._revisions.get(key, 0) + 1
+        with self._lock:
+            for cache_key in [k for k in self._grids if k[0] == key]:
+                del self._grids[cache_key]
+
+    # --- GSheetsConnection 介面 ---
+    @staticmethod
+    def _frame(grid, header):
+        if header is None:
+            return pd.DataFrame(grid)
+        return pd.DataFrame(grid[1:], columns=grid[0]).infer_objects()
+
+    def read(self, spreadsheet=None, worksheet=None, ttl=None, header=0, **options):
+        key = spreadsheet_id(spreadsheet)
+        worksheet = worksheet or self._titles(key)[0]
+        grid = self._grid(key, worksheet)
+        self._network(len(grid) * len(grid[0]))
+        return self._frame(grid, header)
+
+    def read_many(self, spreadsheet, worksheets, header=0):
+        # 模擬 values_batch_get：多個分頁只算一次往返
+        key = spreadsheet_id(spreadsheet)
+        grids = {ws: self._grid(key, ws) for ws in worksheets}
+        self._network(sum(len(g) * len(g[0]) for g in grids.values()))
+        return {ws: self._frame(g, header) for ws, g in grids.items()}
+
+    def read_rows(self, spreadsheet, worksheet, start, stop=None, stop_col=None):
+        key = spreadsheet_id(spreadsheet)
+        grid = [row[:stop_col] for row in self._grid(key, worksheet or self._titles(key)[0])[start:stop]]
+        self._network(len(grid) * (len(grid[0]) if grid else 0))
+        return pd.DataFrame(grid)
+
+    def read_rows_many(self, spreadsheet, ranges):
+        # 模擬 values_batch_get：多個分頁的尾段只算一次往返
+        key = spreadsheet_id(spreadsheet)
+        grids = {ws: [row[:width] for row in self._grid(key, ws)[start:]] for ws, (start, width) in ranges.items()}
+        self._network(sum(len(g) * (len(g[0]) if g else 0) for g in grids.values()))
+        return {ws: pd.DataFrame(g) for ws, g in grids.items()}
+
+    def read_values(self, spreadsheet, worksheet, start=0, stop=None, start_col=0, stop_col=None):
+        key = spreadsheet_id(spreadsheet)
+        rows = [
+            ["" if v is None else v for v in row[start_col:stop_col]]
+            for row in self._grid(key, worksheet or self._titles(key)[0])[start:stop]
+        ]
+        self._network(sum(map(len, rows)))
+        return rows
+
+    def worksheet_titles(self, spreadsheet):
+        self._network()
+        return self._titles(spreadsheet_id(spreadsheet))
+
+    def revision(self, spreadsheet):
+        self._network()
+        return str(self._revisions.get(spreadsheet_id(spreadsheet), 0))
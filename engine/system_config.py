@@ -0,0 +1,13 @@
+import pandas as pd
+
+
+def clean_system_config(df_config):
+    """系統配置表：文字欄位一律去除前後空白，並預先解析月份 (月份_dt / 月份_std)。"""
+    df_config = df_config.copy()
+    for col in df_config.columns:
+        if df_config[col].dtype == object or pd.api.types.is_string_dtype(df_config[col]):
+            df_config[col] = df_config[col].astype(str).str.strip()
+    if '月份' in df_config.columns:
+        df_config['月份_dt'] = pd.to_datetime(df_config['月份'], errors='coerce')
+        df_config['月份_std'] = df_config['月份_dt'].dt.strftime('%Y-%m')
+    return df_config
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from engine.sources import spreadsheet_id
+
+STORE_TOTAL_NAMES = ["ALL", "總表", "全店總表"]
+TITLES_TTL = 3600
+DEFAULT_SHEET = ""  # 代表試算表的第一個分頁
+
+
+def candidate_names(worksheet, branch, forced_name=None):
+    """分頁名稱的嘗試順序 (與舊版 try_list 相同)：secrets 指定名稱 > 原名 > 去「店」字 > 總表 > ALL。"""
+    if worksheet == branch or worksheet in STORE_TOTAL_NAMES:
+        names = [forced_name] if forced_name else []
+        names.extend([worksheet, worksheet.replace("店", ""), "總表", "ALL"])
+        return names
+    return [worksheet]
+
+
+def staff_for_branch(branch_staff, branch):
+    """secrets.toml [branch_staff] 中該分店的人員名單；依序嘗試原名、去「店」字、加「店」字。"""
+    for name in (branch, branch.replace("店", ""), branch + "店"):
+        staff = branch_staff.get(name, [])
+        if staff:
+            return list(staff)
+    return []
+
+
+def resolve_worksheet(titles, candidates, allow_default=False):
+    """在已知分頁清單中依優先順序找出目標分頁；都找不到時 (門市總表) 退回第一個分頁。"""
+    available = set(titles)
+    for name in candidates:
+        if name in available:
+            return name
+    if allow_default and titles:
+        return DEFAULT_SHEET
+    return None
+
+
+class WorksheetIndex:
+    """快取每個試算表的分頁清單，並記錄「候選名稱 → 實際分頁」的對應，之後每次只需讀取一次。
+
+    對應表存成 JSON，重啟後仍可直接使用；不支援列出分頁的連線 (公開試算表) 退回逐一嘗試。
+    """
+
+    def __init__(self, source, path, titles_ttl=TITLES_TTL):
+        self.source = source
+        self.path = path
+        self.titles_ttl = titles_ttl
+        self._lock = threading.Lock()
+        self._titles = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._resolved = json.load(f)
+        except (OSError, ValueError):
+            self._resolved = {}
+
+    def _key(self, spreadsheet, candidates):
+        return spreadsheet_id(spreadsheet) + "|" + "|".join(candidates)
+
+    def _remember(self, key, name):
+        with self._lock:
+            if self._resolved.get(key) == name:
+                return
+            if name is None:
+                self._resolved.pop(key, None)
+            else:
+                self._resolved[key] = name
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._resolved, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def _cached_titles(self, spreadsheet):
+        cached = self._titles.get(spreadsheet_id(spreadsheet))
+        if cached and time.monotonic() - cached[0] < self.titles_ttl:
+            return cached[1]
+        return None
+
+    def titles(self, spreadsheet):
+        cached = self._cached_titles(spreadsheet)
+        if cached is not None:
+            return cached
+        titles = self.source.worksheet_titles(spreadsheet)
+        if titles is not None:
+            self._titles[spreadsheet_id(spreadsheet)] = (time.monotonic(), titles)
+        return titles
+
+    def forget_titles(self, spreadsheet=None):
+        """丟棄快取的分頁清單 (None 為全部)，下次重新列出。"""
+        if spreadsheet is None:
+            self._titles.clear()
+        else:
+            self._titles.pop(spreadsheet_id(spreadsheet), None)
+
+    def _lookup(self, spreadsheet, candidates, allow_default):
+        """依分頁清單解析名稱；無法列出分頁時回傳 None。
+        快取的清單中找不到時重新列出一次 (分頁可能是剛新增的)，仍找不到才報錯。"""
+        cached = self._cached_titles(spreadsheet) is not None
+        titles = self.titles(spreadsheet)
+        if titles is None:
+            return None
+        name = resolve_worksheet(titles, candidates, allow_default)
+        if name is None and cached:
+            self.forget_titles(spreadsheet)
+            titles = self.titles(spreadsheet)
+            name = resolve_worksheet(titles, candidates, allow_default) if titles is not None else None
+        if name is None:
+            raise ValueError(f"❌ 無法讀取任何分頁。已嘗試名稱: {candidates}。請確認分頁名稱或 secrets 設定。")
+        return name
+
+    def _read(self, spreadsheet, name, header):
+        worksheet = None if name == DEFAULT_SHEET else name
+        return self.source.read(spreadsheet, worksheet, header=header)
+
+    def resolve(self, spreadsheet, candidates, allow_default=False):
+        """只解析分頁名稱不讀取資料；無法列出分頁且尚無記錄時回傳 None。"""
+        key = self._key(spreadsheet, candidates)
+        known = self._resolved.get(key)
+        if known is not None:
+            return known
+        name = self._lookup(spreadsheet, candidates, allow_default)
+        if name is not None:
+            self._remember(key, name)
+        return name
+
+    def forget(self, spreadsheet, candidates):
+        self._remember(self._key(spreadsheet, candidates), None)
+        self.forget_titles(spreadsheet)
+
+    def read(self, spreadsheet, candidates, allow_default=False, header=None):
+        key = self._key(spreadsheet, candidates)
+
+        # 1. 已知對應：直接讀 (分頁被改名時才重新探索)
+        known = self._resolved.get(key)
+        if known is not None:
+            try:
+                return self._read(spreadsheet, known, header)
+            except Exception:
+                self.forget(spreadsheet, candidates)
+
+        # 2. 依分頁清單在本機解析名稱，只讀一次
+        name = self._lookup(spreadsheet, candidates, allow_default)
+        if name is not None:
+            df_raw = self._read(spreadsheet, name, header)
+            self._remember(key, name)
+            return df_raw
+
+        # 3. 無法列出分頁：逐一嘗試 (舊版行為)
+        df_raw, found = pd.DataFrame(), None
+        for name in candidates:
+            try:
+                df_raw, found = self._read(spreadsheet, name, header), name
+                break
+            except Exception:
+                continue
+        if df_raw.empty and allow_default:
+            try:
+                df_raw, found = self._read(spreadsheet, DEFAULT_SHEET, header), DEFAULT_SHEET
+            except Exception:
+                pass
+        if df_raw.empty:
+            raise ValueError(f"❌ 無法讀取任何分頁。已嘗試名稱: {candidates}。請確認分頁名稱或 secrets 設定。")
+        self._remember(key, found)
+        return df_raw
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_branch_parse import legacy_parse
+from benchmarks.bench_schema_memory import make_branch_sheet
+from engine.branch_sheet import (DATA_START_ROW, PARSE_REPORT, SheetLayout, describe_parse_report, parse_branch_sheet,
+                                 parse_sheet)
+
+HEADERS = ["日", "毛利", "門號"]
+
+
+def sheet(rows, year=2026, month=9, header_row=2):
+    """第 2 列年/月、header_row 列表頭、第 15 列起為 rows (每列 [日, 毛利, 門號])。"""
+    grid = [[None] * len(HEADERS) for _ in range(DATA_START_ROW)]
+    grid[1][0], grid[1][1] = year, month
+    grid[header_row] = list(HEADERS)
+    return pd.DataFrame(grid + [list(r) for r in rows], dtype=object)
+
+
+@pytest.mark.parametrize("n_metrics", [20, 60])
+def test_matches_legacy_parser(n_metrics):
+    df_raw = make_branch_sheet(n_days=31, n_metrics=n_metrics)
+    expected = legacy_parse(df_raw)
+    expected['日期'] = expected['日期'].astype('datetime64[ns]')
+    # 舊版把空白補 0；新版保留空值 (當日未填)
+    actual = parse_branch_sheet(df_raw)
+    actual = actual.fillna({c: 0.0 for c in actual.columns if c != '日期'})
+    pd.testing.assert_frame_equal(expected, actual, check_names=False)
+
+
+def test_clean_sheet_has_empty_report():
+    df = parse_branch_sheet(sheet([[1, 100, 2], [2, 200, 3]]))
+    report = df.attrs[PARSE_REPORT]
+    assert report == {"header_row": 2, "period": [2026, 9], "bad_cells": {}, "skipped_rows": [], "invalid_days": []}
+    assert describe_parse_report(report) == []
+    assert df['日期'].tolist() == [pd.Timestamp("2026-09-01"), pd.Timestamp("2026-09-02")]
+
+
+def test_bad_cells_are_counted_and_kept_missing():
+    df, report = parse_sheet(sheet([[1, "1,234", 2], [2, 200, "85%"], [3, "x", 1]]))
+    assert report.bad_cells == {"毛利": 2, "門號": 1}
+    assert np.isnan(df.loc[DATA_START_ROW, "毛利"]) and np.isnan(df.loc[DATA_START_ROW + 1, "門號"])
+    assert df.loc[DATA_START_ROW + 1, "毛利"] == 200
+
+
+def test_invalid_days_get_nat():
+    # 9 月沒有 31 日；1.5 不是整數日
+    df, report = parse_sheet(sheet([[30, 1, 1], [31, 2, 2], [1.5, 3, 3]]))
+    assert report.invalid_days == [DATA_START_ROW + 1, DATA_START_ROW + 2]
+    assert df['日期'].isna().tolist() == [False, True, True]
+
+
+def test_rows_without_day_are_skipped_and_reported():
+    df, report = parse_sheet(sheet([[1, 100, 1], ["小計", 100, 1], [None, None, None], [2, 200, 2]]))
+    assert report.skipped_rows == [DATA_START_ROW + 1]
+    assert df.index.tolist() == [DATA_START_ROW, DATA_START_ROW + 3]
+
+
+def test_unreadable_period_gives_nat_not_default_month():
+    df, report = parse_sheet(sheet([[1, 100, 1]], year="年度", month=None))
+    assert report.period is None
+    assert df['日期'].isna().all()
+    assert describe_parse_report(report.as_dict()) == ["無法辨識分頁的年/月，日期欄留空"]
+
+
+def test_header_row_is_detected_when_layout_moves():
+    df, report = parse_sheet(sheet([[1, 100, 1]], header_row=4))
+    assert report.header_row == 4
+    assert list(df.columns) == HEADERS + ['日期']
+    assert df.loc[DATA_START_ROW, "毛利"] == 100
+
+
+def test_custom_layout():
+    grid = sheet([[1, 100, 1]]).iloc[1:].reset_index(drop=True)   # 整份上移一列
+    layout = SheetLayout(period_row=0, header_row=1, data_start=DATA_START_ROW - 1)
+    df, report = parse_sheet(grid, layout)
+    assert report.period == (2026, 9)
+    assert df['毛利'].tolist() == [100.0]
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from engine.cache import LoaderCache, branch_tag
+from engine.instrument import Instrumentation
+
+KEY = ("sheet", "url", "小明", "中正店")
+TAGS = (branch_tag("中正店"),)
+TIMEOUT = 5
+
+
+class BlockingLoader:
+    """呼叫後停在 release 之前，讓測試能在讀取途中動作；回傳第幾次呼叫 (error 只在第一次呼叫時拋出)。"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        self.started.set()
+        assert self.release.wait(TIMEOUT)
+        if self.error is not None and call == 1:
+            raise self.error
+        return {"call": call}
+
+
+def wait_for_waiters(cache, n):
+    # 加入同一次讀取的呼叫端會記一次 shared，之後只等待結果
+    deadline = time.monotonic() + TIMEOUT
+    while cache.instrument.cache_stats().get(KEY[0], {}).get("shared", 0) < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def make_cache():
+    return LoaderCache(ttl=60, instrument=Instrumentation(enabled=True))
+
+
+def test_concurrent_gets_share_one_load():
+    cache = make_cache()
+    loader = BlockingLoader()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get, KEY, loader, TAGS) for _ in range(8)]
+        assert loader.started.wait(TIMEOUT)
+        wait_for_waiters(cache, 7)
+        loader.release.set()
+        results = [f.result(TIMEOUT) for f in futures]
+
+    assert loader.calls == 1
+    assert all(r is results[0] for r in results)
+    assert cache.get(KEY, loader, TAGS) is results[0]
+    assert loader.calls == 1
+
+
+def test_invalidate_during_load_discards_result():
+    cache = make_cache()
+    loader = BlockingLoader()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(cache.get, KEY, loader, TAGS)
+        assert loader.started.wait(TIMEOUT)
+        cache.invalidate(TAGS[0])
+        loader.release.set()
+        # 等待中的呼叫端仍拿到這次的結果，但不寫入快取
+        assert future.result(TIMEOUT) == {"call": 1}
+
+    assert cache.age(KEY) is None
+    assert cache.get(KEY, loader, TAGS) == {"call": 2}
+    assert cache.get(KEY, loader, TAGS) == {"call": 2}
+
+
+def test_failed_load_is_not_cached():
+    cache = make_cache()
+    loader = BlockingLoader(error=RuntimeError("讀取失敗"))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(cache.get, KEY, loader, TAGS) for _ in range(2)]
+        assert loader.started.wait(TIMEOUT)
+        wait_for_waiters(cache, 1)
+        loader.release.set()
+        for f in futures:
+            with pytest.raises(RuntimeError):
+                f.result(TIMEOUT)
+
+    assert loader.calls == 1
+    assert cache.age(KEY) is None
+    assert cache.get(KEY, loader, TAGS) == {"call": 2}
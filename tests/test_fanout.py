@@ -0,0 +1,40 @@
+import pytest
+
+from engine.kpi import KpiRegistry
+from engine.service import DataEngine
+from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+
+
+@pytest.fixture(scope="module")
+def live_all(tmp_path_factory):
+    conn = SyntheticSheetsConnection(8)
+    engine = DataEngine(conn, CONFIG_URL, snapshot_dir=str(tmp_path_factory.mktemp("snapshots")))
+    df_config, _, _ = engine.load_system_config()
+    month_config = df_config[df_config['月份_std'] == df_config['月份_std'].max()]
+    merged, fan_out = engine.load_all_branches(month_config)
+    assert fan_out.complete
+    return merged, fan_out.frames
+
+
+def test_merged_rates_stay_within_store_range(live_all):
+    merged, frames = live_all
+    kpis = KpiRegistry()
+    stores = [kpis.evaluate(df) for df in frames.values()]
+    total = kpis.evaluate(merged)
+
+    for spec in kpis.specs:
+        values = [s[spec.name] for s in stores]
+        if spec.agg == "mean":
+            assert min(values) <= total[spec.name] <= max(values), spec.name
+        else:
+            assert total[spec.name] == pytest.approx(sum(values)), spec.name
+
+
+def test_merged_days_average_rates_over_filled_stores(live_all):
+    merged, frames = live_all
+    day = merged['日期'].iloc[0]
+    rates = [df.loc[df['日期'] == day, '遠傳升續率'].iloc[0] for df in frames.values()]
+    profits = [df.loc[df['日期'] == day, '毛利'].iloc[0] for df in frames.values()]
+    row = merged[merged['日期'] == day].iloc[0]
+    assert row['遠傳升續率'] == pytest.approx(sum(rates) / len(rates))
+    assert row['毛利'] == sum(profits)
@@ -0,0 +1,30 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from benchmarks.bench_streamlit_frames import problem_frames
+from engine.frames import clean_df_for_streamlit
+
+FRAMES = problem_frames()
+
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_problem_frames_convert_to_arrow(name):
+    out = clean_df_for_streamlit(FRAMES[name])
+    pa.Table.from_pandas(out)
+    assert isinstance(out.index, pd.RangeIndex) and out.index.start == 0
+    assert list(out.columns) == list(FRAMES[name].columns)
+
+
+@pytest.mark.parametrize("name", list(FRAMES))
+def test_input_frame_is_not_mutated(name):
+    df = problem_frames()[name]
+    before = df.copy(deep=True)
+    clean_df_for_streamlit(df)
+    pd.testing.assert_frame_equal(df, before)
+    assert df.dtypes.equals(before.dtypes)
+
+
+def test_clean_frame_is_returned_as_is():
+    df = pd.DataFrame({"分店": ["A", "B"], "毛利": [1.0, 2.0]})
+    assert clean_df_for_streamlit(df) is df
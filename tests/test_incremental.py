@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from engine.branch_sheet import DATA_START_ROW, PARSE_REPORT, parse_branch_sheet
+from engine.incremental import IncrementalSheetLoader, _merge_report
+from engine.local_sheets import LocalSheetsConnection
+from engine.sources import SheetSource
+
+URL = "https://docs.google.com/spreadsheets/d/branch1/edit"
+SHEET = "小明"
+HEADERS = ["日", "毛利", "門號", "遠傳升續率"]
+
+
+def daily_sheet(year=2026, month=10, days=31, filled=31, edits=None):
+    """分店分頁版面：第 2 列年/月、第 3 列表頭、第 15 列起每日資料 (未填寫的日子空白)。"""
+    rows = [[None] * len(HEADERS) for _ in range(DATA_START_ROW)]
+    rows[1][0], rows[1][1] = year, month
+    rows[2] = list(HEADERS)
+    for day in range(1, days + 1):
+        rows.append([day, 100 * day, day % 3, 0.5] if day <= filled else [day, None, None, None])
+    for (day, col), value in (edits or {}).items():
+        rows[DATA_START_ROW + day - 1][HEADERS.index(col)] = value
+    return pd.DataFrame(rows)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RowsCountingSource(SheetSource):
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.tail_starts = []
+
+    def read_rows(self, spreadsheet, worksheet, start, stop=None, stop_col=None):
+        self.tail_starts.append(start)
+        return super().read_rows(spreadsheet, worksheet, start, stop, stop_col)
+
+
+@pytest.fixture
+def env(tmp_path):
+    conn = LocalSheetsConnection(str(tmp_path))
+    conn.write(URL, SHEET, daily_sheet(filled=15), header=False)
+    source = RowsCountingSource(conn)
+    clock = Clock(datetime(2026, 10, 15, 12))
+    loader = IncrementalSheetLoader(source, timedelta(hours=1), clock=clock)
+    return conn, source, clock, loader
+
+
+def load(loader):
+    return loader.load(URL, SHEET, parse_branch_sheet)
+
+
+def full_parse(conn):
+    return parse_branch_sheet(conn.read(URL, SHEET, header=None))
+
+
+def assert_same_as_full(parsed, conn):
+    expected = full_parse(conn)
+    pd.testing.assert_frame_equal(parsed, expected, check_dtype=False)
+    assert parsed.attrs[PARSE_REPORT] == expected.attrs[PARSE_REPORT]
+
+
+def test_first_load_is_full(env):
+    conn, source, clock, loader = env
+    parsed, complete = load(loader)
+    assert complete
+    assert source.tail_starts == []
+    assert_same_as_full(parsed, conn)
+
+
+def test_tail_resumes_at_today_and_matches_full_parse(env):
+    conn, source, clock, loader = env
+    load(loader)
+
+    # 今天 (15 日) 與之後的列被填寫 / 修改
+    conn.write(URL, SHEET, daily_sheet(filled=17, edits={(15, "毛利"): 999}), header=False)
+    clock.now += timedelta(minutes=5)
+    parsed, complete = load(loader)
+
+    assert not complete
+    assert source.tail_starts == [DATA_START_ROW + 14]
+    assert loader.stats == {"full": 1, "incremental": 1, "rows_fetched": DATA_START_ROW + 31 + 17}
+    assert_same_as_full(parsed, conn)
+
+
+def test_tail_merges_parse_report_with_shifted_rows(env):
+    conn, source, clock, loader = env
+    conn.write(URL, SHEET, daily_sheet(filled=15, edits={(3, "門號"): "未填"}), header=False)
+    load(loader)
+
+    edits = {(3, "門號"): "未填", (20, "毛利"): "1,234"}
+    sheet = daily_sheet(filled=20, edits=edits)
+    sheet.loc[len(sheet)] = [None, 5, None, None]          # 第一欄不是日期但有內容的列
+    conn.write(URL, SHEET, sheet, header=False)
+    clock.now += timedelta(minutes=5)
+    parsed, complete = load(loader)
+
+    assert not complete
+    report = parsed.attrs[PARSE_REPORT]
+    assert report["skipped_rows"] == [DATA_START_ROW + 31]
+    assert report["bad_cells"] == {"門號": 1, "毛利": 1}
+    assert_same_as_full(parsed, conn)
+
+
+def test_merge_report_keeps_rows_before_resume():
+    resume = DATA_START_ROW + 10
+    kept = {"header_row": 2, "period": [2026, 10], "bad_cells": {"毛利": 2},
+            "skipped_rows": [DATA_START_ROW + 1, DATA_START_ROW + 12], "invalid_days": []}
+    tail = {"header_row": 2, "period": [2026, 10], "bad_cells": {"門號": 1},
+            "skipped_rows": [DATA_START_ROW + 3], "invalid_days": [DATA_START_ROW]}
+    merged = _merge_report(kept, tail, resume)
+    assert merged["skipped_rows"] == [DATA_START_ROW + 1, resume + 3]
+    assert merged["invalid_days"] == [resume]
+    assert merged["bad_cells"] == {"毛利": 2, "門號": 1}
+    assert _merge_report(None, tail, resume) is tail
+
+
+def test_earlier_edit_waits_for_reconcile(env):
+    conn, source, clock, loader = env
+    load(loader)
+    conn.write(URL, SHEET, daily_sheet(filled=15, edits={(2, "毛利"): 5}), header=False)
+
+    clock.now += timedelta(minutes=30)
+    parsed, complete = load(loader)
+    assert not complete
+    assert parsed.loc[DATA_START_ROW + 1, "毛利"] == 200
+
+    clock.now += timedelta(minutes=31)
+    parsed, complete = load(loader)
+    assert complete
+    assert_same_as_full(parsed, conn)
+
+
+def test_force_reads_full_sheet(env):
+    conn, source, clock, loader = env
+    load(loader)
+    conn.write(URL, SHEET, daily_sheet(filled=15, edits={(2, "毛利"): 5}), header=False)
+    parsed, complete = loader.load(URL, SHEET, parse_branch_sheet, force=True)
+    assert complete
+    assert source.tail_starts == []
+    assert_same_as_full(parsed, conn)
+
+
+def test_month_rollover_reads_full_sheet(env):
+    conn, source, clock, loader = env
+    load(loader)
+    clock.now = datetime(2026, 11, 1, 0, 5)
+    conn.write(URL, SHEET, daily_sheet(filled=31, edits={(2, "毛利"): 5}), header=False)
+    parsed, complete = load(loader)
+    assert complete
+    assert source.tail_starts == []
+    assert_same_as_full(parsed, conn)
+
+
+def test_read_tail_uses_prefetched_rows(env):
+    conn, source, clock, loader = env
+    load(loader)
+    conn.write(URL, SHEET, daily_sheet(filled=16), header=False)
+    start, width = loader.tail_range(URL, SHEET)
+    assert (start, width) == (DATA_START_ROW + 14, len(HEADERS))
+
+    prefetched = conn.read_rows(URL, SHEET, start, stop_col=width)
+    parsed, _ = loader.load(URL, SHEET, parse_branch_sheet, read_tail=lambda s: prefetched if s == start else None)
+    assert source.tail_starts == []
+    assert_same_as_full(parsed, conn)
+
+
+def test_byte_budget_evicts_least_recently_used(tmp_path):
+    conn = LocalSheetsConnection(str(tmp_path))
+    for name in ("a", "b", "c"):
+        conn.write(URL, name, daily_sheet(filled=15), header=False)
+    clock = Clock(datetime(2026, 10, 15, 12))
+    probe = IncrementalSheetLoader(SheetSource(conn), clock=clock)
+    probe.load(URL, "a", parse_branch_sheet)
+    one_state = probe.memory_usage()["bytes"]
+
+    loader = IncrementalSheetLoader(SheetSource(conn), clock=clock, max_bytes=int(one_state * 2.5))
+    for name in ("a", "b", "a", "c"):
+        loader.load(URL, name, parse_branch_sheet)
+    usage = loader.memory_usage()
+    assert usage["states"] == 2 and usage["bytes"] <= usage["max_bytes"]
+
+    # b 最久未讀而被移除：下次整頁讀取；a、c 仍只抓尾段
+    assert loader.tail_range(URL, "b") is None
+    assert loader.tail_range(URL, "a") is not None
+    assert loader.tail_range(URL, "c") is not None
+    assert loader.load(URL, "b", parse_branch_sheet)[1]
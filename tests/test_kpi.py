@@ -0,0 +1,64 @@
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.kpi import KpiRegistry, KpiSpec
+
+SPECS = [
+    KpiSpec("總毛利", "毛利", "sum"),
+    KpiSpec("升續率", "遠傳升續率", "mean"),
+    KpiSpec("庫存", "庫存手機", "last"),
+    KpiSpec("不存在", "沒有這欄", "sum"),
+]
+
+
+def frame(profit, rate, stock):
+    return pd.DataFrame({"毛利": profit, "遠傳升續率": rate, "庫存手機": stock})
+
+
+def test_sum_mean_last():
+    df = frame([100, 200, np.nan, 50], [0.5, 0.7, np.nan, 0.9], [10, 8, np.nan, 6])
+    values = KpiRegistry(SPECS).evaluate(df)
+    assert values == {"總毛利": 350, "升續率": pytest.approx(0.7), "庫存": 6, "不存在": 0.0}
+
+
+def test_zero_is_a_filled_value():
+    # 填 0 是有填寫：列入平均、也可以是最後一個值；只有空值才是未填
+    df = frame([0, 0, 0, np.nan], [0.6, 0.0, 0.0, np.nan], [5, 3, 0, np.nan])
+    values = KpiRegistry(SPECS).evaluate(df)
+    assert values["總毛利"] == 0
+    assert values["升續率"] == pytest.approx(0.2)
+    assert values["庫存"] == 0
+
+
+def test_unfilled_columns_are_zero():
+    df = frame([np.nan] * 3, [np.nan] * 3, [np.nan] * 3)
+    assert KpiRegistry(SPECS).evaluate(df) == dict.fromkeys(["總毛利", "升續率", "庫存", "不存在"], 0.0)
+    assert KpiRegistry(SPECS).evaluate(pd.DataFrame()) == dict.fromkeys(["總毛利", "升續率", "庫存", "不存在"], 0.0)
+
+
+def test_text_cells_are_coerced():
+    df = frame(pd.Series(["100", "x", 50], dtype=object), [0.5, 0.5, 0.5], [1, 2, 3])
+    assert KpiRegistry(SPECS).evaluate(df)["總毛利"] == 150
+
+
+def test_memo_follows_frame_lifetime():
+    kpis = KpiRegistry(SPECS)
+    df = frame([100, 200], [0.5, 0.7], [10, 8])
+    first = kpis.evaluate(df)
+    assert kpis.evaluate(df) is first
+    assert len(kpis._memo) == 1
+
+    # 內容相同的另一份 DataFrame 不共用結果
+    assert kpis.evaluate(df.copy()) is not first
+
+    del df
+    gc.collect()
+    assert kpis._memo == {}
+
+
+def test_invalid_aggregation_is_rejected():
+    with pytest.raises(ValueError):
+        KpiSpec("毛利率", "毛利", "median")
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+from benchmarks.bench_leaderboard_clean import legacy_clean, make_leaderboard
+from engine.leaderboard import clean_leaderboard, read_leaderboard
+from engine.local_sheets import LocalSheetsConnection
+from engine.schema import MONTH_KEY
+from engine.service import DataEngine, parse_leaderboard
+from engine.sources import SheetSource
+
+URL = "https://docs.google.com/spreadsheets/d/config1/edit"
+SHEET = "排名結果"
+HEADER = ["月份", "分店", "人員", "毛利", "來客數", "--->勿動", "後台"]
+MONTHS = ["2026/07/01", "2026/08/01", "2026/09/01"]
+
+
+def ranked_sheet():
+    """依分店排列的排名結果：分店只寫在分店區塊第一列、月份只寫在每月第一列 (合併儲存格)。"""
+    rows = []
+    for b, branch in enumerate(["中正店", "信義店"]):
+        for m, month in enumerate(MONTHS):
+            for p, person in enumerate(["小明", "小華", branch[:-1]]):
+                rows.append([month if p == 0 else None, branch if m == 0 and p == 0 else None, person,
+                             1000 * b + 100 * m + p, 10 + p, None, 0.5])
+    return pd.DataFrame(rows, columns=HEADER)
+
+
+@pytest.fixture
+def source(tmp_path):
+    conn = LocalSheetsConnection(str(tmp_path))
+    conn.write(URL, SHEET, ranked_sheet())
+    return SheetSource(conn)
+
+
+@pytest.mark.parametrize("recent_months", [1, 2, 3])
+def test_recent_months_matches_filtered_full_read(source, recent_months):
+    full = parse_leaderboard(source.read(URL, SHEET, header=0))
+    wanted = sorted(full[MONTH_KEY].unique())[-recent_months:]
+    expected = full[full[MONTH_KEY].isin(wanted)].reset_index(drop=True)
+
+    # 最近 1、2 個月時中正店的分店儲存格 (2026/07 第一列) 不在下載範圍內，須由整欄補齊的鍵寫回
+    recent = parse_leaderboard(read_leaderboard(source, URL, SHEET, recent_months))
+    assert set(recent['分店'].astype(str)) == {"中正店", "信義店"}
+    pd.testing.assert_frame_equal(recent, expected, check_dtype=False, check_categorical=False)
+
+
+def test_projection_drops_columns_right_of_cut_off(source):
+    projected = read_leaderboard(source, URL, SHEET)
+    assert list(projected.columns) == HEADER[:5]
+    pd.testing.assert_frame_equal(parse_leaderboard(projected), parse_leaderboard(source.read(URL, SHEET, header=0)),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_not_applicable_returns_none(source):
+    # 沒有切刀欄位：未限制月份時不需範圍讀取；沒有月份欄時無法只取最近 N 個月
+    source.conn.write(URL, SHEET, ranked_sheet().drop(columns=["--->勿動", "後台"]))
+    assert read_leaderboard(source, URL, SHEET) is None
+    source.conn.write(URL, SHEET, ranked_sheet().drop(columns=["月份"]))
+    assert read_leaderboard(source, URL, SHEET, recent_months=1) is None
+
+
+class FailingValuesConnection(LocalSheetsConnection):
+    def read_values(self, *args, **kwargs):
+        raise PermissionError("403: 權限不足")
+
+
+def test_range_read_errors_propagate(tmp_path):
+    conn = FailingValuesConnection(str(tmp_path / "sheets"))
+    conn.write(URL, "系統配置", pd.DataFrame({"月份": [MONTHS[0]], "分店代號": ["中正店"], "試算表網址": ["x"]}))
+    conn.write(URL, SHEET, ranked_sheet())
+    engine = DataEngine(conn, URL, snapshot_dir=str(tmp_path / "snapshots"), leaderboard_months=1)
+    with pytest.raises(PermissionError):
+        engine.load_system_config()
+
+
+@pytest.mark.parametrize("n_rows, seed", [(500, 0), (5_000, 1), (20_000, 2)])
+def test_clean_matches_legacy(n_rows, seed):
+    df_raw = make_leaderboard(n_rows, seed=seed)
+    pd.testing.assert_frame_equal(clean_leaderboard(df_raw), legacy_clean(df_raw))
+
+
+def test_clean_matches_legacy_without_cut_off_or_dates():
+    # 沒有切刀欄位、月份無法解析、來客數已是數字
+    df_raw = make_leaderboard(1_000).drop(columns=["--->勿動"])
+    df_raw["月份"] = df_raw["月份"].where(df_raw.index % 3 != 1, "待補")
+    df_raw["來客數"] = (df_raw["來客數"] - pd.Timestamp("1899-12-30")).dt.days
+    pd.testing.assert_frame_equal(clean_leaderboard(df_raw), legacy_clean(df_raw))
@@ -0,0 +1,59 @@
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from engine.service import DataEngine
+from engine.synthetic import CONFIG_URL, SyntheticSheetsConnection
+from engine.worksheets import staff_for_branch
+
+
+@pytest.fixture
+def branch(tmp_path):
+    conn = SyntheticSheetsConnection(3)
+    engine = DataEngine(conn, CONFIG_URL, snapshot_dir=str(tmp_path), instrument=True)
+    df_config, _, _ = engine.load_system_config()
+    month_config = df_config[df_config['月份_std'] == df_config['月份_std'].max()]
+    name, url = next((b, u) for b, u in zip(month_config['分店代號'], month_config['試算表網址']) if b != "ALL")
+    return conn, engine, name, url, [name] + staff_for_branch(conn.staff, name)
+
+
+def api_stages(engine, load):
+    engine.instrument._events.clear()
+    load()
+    return Counter(e["stage"] for e in engine.instrument.events() if e["stage"].startswith("sheets."))
+
+
+def load_branch(engine, name, url, tabs):
+    engine.prefetch_branch(url, name, tabs)
+    return {ws: engine.load_data(url, ws, name) for ws in tabs}
+
+
+def test_config_checks_revision_once(branch):
+    conn, engine, *_ = branch
+    engine.clear()
+    engine.source._revisions.clear()
+    assert api_stages(engine, engine.load_system_config)["sheets.revision"] == 1
+
+
+def test_prefetch_uses_one_revision_and_one_read(branch):
+    conn, engine, name, url, tabs = branch
+    assert api_stages(engine, lambda: load_branch(engine, name, url, tabs)) == Counter(
+        {"sheets.titles": 1, "sheets.revision": 1, "sheets.read_many": 1})
+
+
+def test_prefetch_batches_incremental_tails(branch):
+    conn, engine, name, url, tabs = branch
+    load_branch(engine, name, url, tabs)
+    conn.touch(url)
+    engine.cache.clear()                    # 只讓記憶體快取過期，保留增量狀態
+    engine.source._revisions.clear()
+    frames = {}
+    stages = api_stages(engine, lambda: frames.update(load_branch(engine, name, url, tabs)))
+    assert stages == Counter({"sheets.revision": 1, "sheets.read_rows_many": 1})
+
+    fresh = DataEngine(conn, CONFIG_URL, snapshot_dir=engine.snapshots.root + "-fresh", incremental=False)
+    for ws in tabs:
+        expected = fresh.load_data(url, ws, name)
+        pd.testing.assert_frame_equal(frames[ws].reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine.ranking import RankIndex
+
+METRICS = ["毛利", "門號", "來客數"]
+MONTHS = ["2026-08", "2026-09", "2026-10"]
+
+
+def leaderboard(seed=0):
+    """清洗後的排行榜；信義店 2026-10 沒有資料 (缺少的月份/分店組合)。"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for month in MONTHS:
+        for branch in ["中正店", "信義店", "板橋店"]:
+            if branch == "信義店" and month == "2026-10":
+                continue
+            for person in ["小明", "小華", "小美", "阿強"]:
+                rows.append([month, branch, person, *rng.random(len(METRICS)) * 10_000])
+    df = pd.DataFrame(rows, columns=["月份", "分店", "人員"] + METRICS)
+    df["月份"] = df["月份"].astype("category")
+    return df
+
+
+@pytest.fixture(scope="module")
+def lb():
+    df = leaderboard()
+    return df, RankIndex(df)
+
+
+def expected_top(df, month, metric, k, branch=None):
+    rows = df[(df["月份"] == month) & ((df["分店"] == branch) if branch else True)]
+    totals = rows.groupby(["分店", "人員"], observed=True)[metric].sum()
+    return totals.nlargest(len(totals) if k is None else k)
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, None])
+@pytest.mark.parametrize("metric", METRICS)
+@pytest.mark.parametrize("month", MONTHS)
+def test_top_people_matches_pandas(lb, month, metric, k):
+    df, index = lb
+    expected = expected_top(df, month, metric, k)
+    got = index.top_people(month, metric, k)
+    assert list(zip(got["分店"], got["人員"])) == expected.index.tolist()
+    np.testing.assert_allclose(got[metric], expected.to_numpy())
+    assert (got["Display"] == got["分店"] + " - " + got["人員"]).all()
+
+
+@pytest.mark.parametrize("branch", ["中正店", "板橋店"])
+def test_top_people_per_branch_matches_pandas(lb, branch):
+    df, index = lb
+    expected = expected_top(df, "2026-09", "毛利", 2, branch)
+    got = index.top_people("2026-09", "毛利", 2, branch=branch)
+    assert list(zip(got["分店"], got["人員"])) == expected.index.tolist()
+    np.testing.assert_allclose(got["毛利"], expected.to_numpy())
+
+
+def test_store_totals_match_pandas(lb):
+    df, index = lb
+    for month in MONTHS:
+        expected = df[df["月份"] == month].groupby("分店")["門號"].sum().sort_values(ascending=False)
+        got = index.store_totals(month, "門號")
+        assert got["分店"].tolist() == expected.index.tolist()
+        np.testing.assert_allclose(got["門號"], expected.to_numpy())
+
+
+def test_missing_month_or_branch_is_empty(lb):
+    df, index = lb
+    assert index.top_people("2026-01", "毛利").empty
+    assert index.top_people("2026-10", "毛利", branch="信義店").empty
+    assert not index.has_rows("2026-10", "信義店") and index.has_rows("2026-09", "信義店")
+    assert index.store_totals("2026-01", "毛利").empty
+    assert index.breakdown("2026-10", "毛利", branch="信義店").empty
+    assert "信義店" not in index.store_totals("2026-10", "毛利")["分店"].tolist()
+
+
+def test_cube_matches_pandas_groupby():
+    df = leaderboard(seed=1)
+    df = pd.concat([df, df.iloc[[0, 5]]], ignore_index=True)      # 同一人重複的列須加總
+    cube = RankIndex(df).cube
+    people = df.groupby(["月份", "分店", "人員"], observed=True)[METRICS].sum()
+
+    for month in MONTHS:
+        pd.testing.assert_frame_equal(cube.people_in(month), people.loc[month], check_names=False)
+        stores = people.loc[month].groupby(level="分店").sum()
+        pd.testing.assert_frame_equal(cube.stores_in(month), stores, check_names=False)
+        pd.testing.assert_series_equal(cube.company_in(month), people.loc[month].sum(), check_names=False)
+        branch = cube.people_in(month, "中正店")
+        pd.testing.assert_frame_equal(branch, people.loc[(month, "中正店")], check_names=False)
+    assert cube.months == MONTHS
+
+
+def test_cube_missing_month_or_branch():
+    cube = RankIndex(leaderboard()).cube
+    # 不存在的 (月份) / (月份, 分店) 經由 _slice 的 KeyError 分支回傳空表，欄位不變
+    for frame in (cube.people_in("2026-01"), cube.people_in("2026-10", "信義店"), cube.stores_in("2026-01")):
+        assert frame.empty and list(frame.columns) == METRICS
+    assert cube.people_in("2026-10", "信義店").index.names == ["人員"]
+    assert (cube.company_in("2026-01") == 0).all()
+    assert cube.series("毛利", "信義店").index.tolist() == MONTHS[:2]
@@ -0,0 +1,153 @@
+import os
+
+import pandas as pd
+import pytest
+
+from engine import snapshot
+from engine.local_sheets import LocalSheetsConnection
+from engine.snapshot import SnapshotCache
+from engine.sources import SheetSource
+
+URL = "https://docs.google.com/spreadsheets/d/abc123/edit"
+
+
+class CountingConnection(LocalSheetsConnection):
+    """記錄實際讀取 CSV 的次數 (代表一次下載)。"""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.reads = 0
+
+    def read(self, *args, **kwargs):
+        self.reads += 1
+        return super().read(*args, **kwargs)
+
+
+class FrozenRevisionConnection(CountingConnection):
+    """修改時間不變的連線 (IMPORTRANGE / 公式重算不會更新 Drive 的修改時間)。"""
+
+    def revision(self, spreadsheet):
+        return "frozen"
+
+
+class NoRevisionConnection(CountingConnection):
+    """取不到版本標記的連線 (例如公開試算表)：快照層改用內容雜湊。"""
+
+    def revision(self, spreadsheet):
+        return None
+
+
+def parse(df_raw):
+    return df_raw.assign(total=df_raw["a"] + df_raw["b"])
+
+
+def bump_mtime(conn, spreadsheet, worksheet, seconds=10):
+    path = conn._path(spreadsheet, worksheet)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = CountingConnection(str(tmp_path / "sheets"))
+    conn.write(URL, "資料", pd.DataFrame({"a": [1, 2, 3], "b": [10, 20, 30]}))
+    return conn
+
+
+def make_cache(conn, tmp_path, **options):
+    return SnapshotCache(SheetSource(conn, revision_ttl=0), str(tmp_path / "snapshots"), **options)
+
+
+def test_marker_hit_reads_snapshot_without_download(conn, tmp_path):
+    first = make_cache(conn, tmp_path).load(URL, "資料", parse, header=0)
+    assert conn.reads == 1
+
+    # 新的 SnapshotCache (例如重新部署後)：標記相同，直接讀磁碟快照
+    second = make_cache(conn, tmp_path).load(URL, "資料", parse, header=0)
+    assert conn.reads == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_marker_miss_downloads_again(conn, tmp_path):
+    cache = make_cache(conn, tmp_path)
+    cache.load(URL, "資料", parse, header=0)
+
+    conn.write(URL, "資料", pd.DataFrame({"a": [1, 2, 3], "b": [10, 20, 99]}))
+    bump_mtime(conn, URL, "資料")
+    df = cache.load(URL, "資料", parse, header=0)
+    assert conn.reads == 2
+    assert df["total"].tolist() == [11, 22, 102]
+
+    # 新標記已存檔：再讀一次不需下載
+    make_cache(conn, tmp_path).load(URL, "資料", parse, header=0)
+    assert conn.reads == 2
+
+
+def test_content_hash_fallback(conn, tmp_path):
+    conn = NoRevisionConnection(conn.root)
+    cache = make_cache(conn, tmp_path)
+    calls = []
+
+    def counting_parse(df_raw):
+        calls.append(len(df_raw))
+        return parse(df_raw)
+
+    cache.load(URL, "資料", counting_parse, header=0)
+    df = cache.load(URL, "資料", counting_parse, header=0)
+    # 沒有標記時每次都要下載，但內容沒變就沿用快照、不重新解析
+    assert conn.reads == 2
+    assert calls == [3]
+    assert df["total"].tolist() == [11, 22, 33]
+
+    conn.write(URL, "資料", pd.DataFrame({"a": [1, 2, 3, 4], "b": [10, 20, 30, 40]}))
+    df = cache.load(URL, "資料", counting_parse, header=0)
+    assert calls == [3, 4]
+    assert df["total"].tolist() == [11, 22, 33, 44]
+
+
+def test_pickle_fallback_for_mixed_columns(conn, tmp_path):
+    def mixed(df_raw):
+        # 數字與文字混在同一欄：Parquet 無法寫入，改存 pickle
+        return df_raw.assign(note=pd.Series([1, "x", 2.5], dtype=object))
+
+    first = make_cache(conn, tmp_path).load(URL, "資料", mixed, header=0)
+    snapshots = os.listdir(tmp_path / "snapshots")
+    assert any(name.endswith(".pkl") for name in snapshots)
+    assert not any(name.endswith(".parquet") for name in snapshots)
+
+    second = make_cache(conn, tmp_path).load(URL, "資料", mixed, header=0)
+    assert conn.reads == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_max_age_rereads_when_marker_does_not_change(conn, tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(snapshot.time, "time", lambda: now[0])
+    conn = FrozenRevisionConnection(conn.root)
+    cache = make_cache(conn, tmp_path, max_age=60)
+    calls = []
+
+    def counting_parse(df_raw):
+        calls.append(len(df_raw))
+        return parse(df_raw)
+
+    cache.load(URL, "資料", counting_parse, header=0)
+    conn.write(URL, "資料", pd.DataFrame({"a": [1, 2, 3], "b": [10, 20, 99]}))
+
+    # 未超過 max_age：相信標記，不下載
+    now[0] += 30
+    assert cache.load(URL, "資料", counting_parse, header=0)["total"].tolist() == [11, 22, 33]
+    assert conn.reads == 1
+
+    # 超過 max_age：重新下載，內容不同就重新解析
+    now[0] += 60
+    assert cache.load(URL, "資料", counting_parse, header=0)["total"].tolist() == [11, 22, 102]
+    assert conn.reads == 2 and calls == [3, 3]
+
+    # 再次超過 max_age 但內容沒變：沿用快照不重新解析，並重新計時
+    now[0] += 90
+    assert cache.load(URL, "資料", counting_parse, header=0)["total"].tolist() == [11, 22, 102]
+    assert conn.reads == 3 and calls == [3, 3]
+    now[0] += 30
+    cache.load(URL, "資料", counting_parse, header=0)
+    assert conn.reads == 3
@@ -0,0 +1,103 @@
+import json
+
+import pandas as pd
+import pytest
+
+from engine.worksheets import DEFAULT_SHEET, WorksheetIndex, candidate_names
+
+URL = "https://docs.google.com/spreadsheets/d/branch1/edit"
+
+
+class RenamingSource:
+    """假的 SheetSource：分頁以名稱存放，可在兩次呼叫之間改名；記錄列出分頁與讀取的次數。"""
+
+    def __init__(self, titles, listable=True):
+        self.tabs = {name: pd.DataFrame({"名稱": [name]}) for name in titles}
+        self.listable = listable
+        self.listed = 0
+        self.reads = []
+
+    def rename(self, old, new):
+        self.tabs[new] = self.tabs.pop(old)
+        self.tabs[new]["名稱"] = new
+
+    def worksheet_titles(self, spreadsheet):
+        if not self.listable:
+            return None
+        self.listed += 1
+        return list(self.tabs)
+
+    def read(self, spreadsheet, worksheet=None, header=None):
+        self.reads.append(worksheet)
+        if worksheet is None:
+            return next(iter(self.tabs.values()))
+        if worksheet not in self.tabs:
+            raise ValueError(f"找不到分頁: {worksheet}")
+        return self.tabs[worksheet]
+
+
+def make_index(source, tmp_path):
+    return WorksheetIndex(source, str(tmp_path / "worksheet_index.json"))
+
+
+def test_resolve_follows_candidate_order(tmp_path):
+    source = RenamingSource(["說明", "總表", "中正", "中正店特別版"])
+    index = make_index(source, tmp_path)
+    assert index.resolve(URL, candidate_names("中正店", "中正店")) == "中正"
+    assert index.resolve(URL, candidate_names("中正店", "中正店", "中正店特別版")) == "中正店特別版"
+    assert index.resolve(URL, candidate_names("信義店", "信義店")) == "總表"
+    assert index.resolve(URL, ["小明"], allow_default=True) == DEFAULT_SHEET
+    assert source.listed == 1
+
+
+def test_miss_relists_titles_once(tmp_path):
+    source = RenamingSource(["小明", "小華"])
+    index = make_index(source, tmp_path)
+    index.resolve(URL, ["小明"])
+
+    # 新增的分頁不在快取的清單中：重新列出一次即可找到
+    source.tabs["小美"] = pd.DataFrame({"名稱": ["小美"]})
+    assert index.resolve(URL, ["小美"]) == "小美"
+    assert source.listed == 2
+
+    # 重新列出後仍找不到才報錯，且只重新列出一次
+    with pytest.raises(ValueError):
+        index.resolve(URL, ["阿強"])
+    assert source.listed == 3
+
+
+def test_renamed_tab_is_rediscovered_and_persisted(tmp_path):
+    source = RenamingSource(["中正店", "總表"])
+    index = make_index(source, tmp_path)
+    candidates = candidate_names("中正店", "中正店")
+    assert index.read(URL, candidates)["名稱"].tolist() == ["中正店"]
+
+    source.rename("中正店", "中正")
+    assert index.read(URL, candidates)["名稱"].tolist() == ["中正"]
+    assert source.reads == ["中正店", "中正店", "中正"]
+    assert source.listed == 2
+
+    with open(tmp_path / "worksheet_index.json", encoding="utf-8") as f:
+        assert list(json.load(f).values()) == ["中正"]
+
+
+def test_persisted_index_skips_listing_after_restart(tmp_path):
+    source = RenamingSource(["小明"])
+    make_index(source, tmp_path).read(URL, ["小明"])
+    assert source.listed == 1
+
+    restarted = RenamingSource(["小明"])
+    index = make_index(restarted, tmp_path)
+    assert index.resolve(URL, ["小明"]) == "小明"
+    assert index.read(URL, ["小明"])["名稱"].tolist() == ["小明"]
+    assert restarted.listed == 0 and restarted.reads == ["小明"]
+
+
+def test_unlistable_source_tries_candidates_in_order(tmp_path):
+    source = RenamingSource(["中正", "總表"], listable=False)
+    index = make_index(source, tmp_path)
+    candidates = candidate_names("中正店", "中正店")
+    assert index.resolve(URL, candidates) is None
+    assert index.read(URL, candidates)["名稱"].tolist() == ["中正"]
+    assert source.reads == ["中正店", "中正"]
+    assert index.resolve(URL, candidates) == "中正"